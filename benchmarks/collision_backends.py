@@ -0,0 +1,68 @@
+"""
+SAT vs Shapely collision backends.
+
+Cross-checks SATCollisionChecker against the Shapely `is_collision` on random
+continuous states, then times single-state and batched collision checks and
+continuous batch rollouts of a solved policy with each backend.
+
+    python -m benchmarks.collision_backends [--states N] [--rollouts N]
+"""
+import argparse
+import contextlib
+import io
+import time
+import numpy as np
+from src.cspace import compare_collision_backends
+from src.environment import Environment
+from src.planning import ValueIterationPlanner
+from src.simulation import simulate_batch, random_free_starts
+
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.time()
+    result = fn(*args, **kwargs)
+    return result, time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--states', type=int, default=100000, help="random states for the cross-check")
+    parser.add_argument('--rollouts', type=int, default=10000, help="start states for the batch rollouts")
+    args = parser.parse_args()
+
+    envs = {backend: Environment(collision_backend=backend) for backend in ('shapely', 'sat')}
+    mismatches = compare_collision_backends(envs['sat'], args.states)
+
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0, envs['sat'].nx, args.states)
+    y = rng.uniform(0, envs['sat'].ny, args.states)
+    theta = rng.integers(0, envs['sat'].n_theta, args.states)
+    single = [(x[i], y[i], theta[i]) for i in range(min(args.states, 20000))]
+
+    planner = ValueIterationPlanner(envs['sat'])
+    quiet(planner.precompute_collision_map)
+    quiet(planner.solve, 'backward_dijkstra', save=False)
+    starts = random_free_starts(planner, args.rollouts)
+
+    print(f"{'backend':<8} {'single (us/state)':>18} {'batch (us/state)':>17} {'rollouts':>10}  outcome")
+    results = {}
+    for backend, env in envs.items():
+        env.is_collision_batch(x[:1], y[:1], theta[:1])  # build the checker outside the timings
+        _, t_single = timed(lambda: [env.is_collision(s) for s in single])
+        _, t_batch = timed(env.is_collision_batch, x, y, theta)
+        results[backend], t_rollouts = timed(simulate_batch, planner, env, starts, continuous_mode=True)
+        print(f"{backend:<8} {1e6 * t_single / len(single):>18.2f} {1e6 * t_batch / args.states:>17.3f} "
+              f"{t_rollouts:>9.2f}s  {results[backend].summary()}")
+
+    same = np.array_equal(results['sat'].outcomes, results['shapely'].outcomes) and \
+        np.array_equal(results['sat'].steps, results['shapely'].steps)
+    print(f"Cross-check mismatches: {mismatches}, identical rollouts: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Raster vs exact collision map.
+
+Builds the collision map of the current config with both methods, times them
+and checks the raster map against the exact one with `compare_collision_maps`:
+the raster map must never miss a collision (the exit status is non-zero if it
+does), the conservative extra states are reported.
+
+    python -m benchmarks.collision_map [--workers N] [--res N]
+"""
+import argparse
+import contextlib
+import io
+import sys
+import time
+from src import config
+from src.cspace import build_collision_map_exact, build_collision_map_raster, compare_collision_maps
+from src.environment import Environment
+
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=None, help="processes for the exact map (default COLLISION_MAP_WORKERS)")
+    parser.add_argument('--res', type=int, default=None, help="raster cells per grid unit (default COLLISION_RASTER_RES)")
+    args = parser.parse_args()
+
+    env = Environment()
+    res = args.res or config.COLLISION_RASTER_RES
+    start = time.perf_counter()
+    raster = build_collision_map_raster(env, res)
+    t_raster = time.perf_counter() - start
+    start = time.perf_counter()
+    exact = quiet(build_collision_map_exact, env, workers=args.workers)
+    t_exact = time.perf_counter() - start
+    print(f"raster (res {res}): {t_raster:.2f}s, exact: {t_exact:.2f}s")
+    _, missed = compare_collision_maps(raster, exact)
+    if missed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
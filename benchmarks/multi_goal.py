@@ -0,0 +1,68 @@
+"""
+Batched multi-goal value iteration vs one value iteration per goal.
+
+Solves the goals in GOAL_STATES (extended with random free states up to
+--goals) once with solve(method='multi_goal') and once with a separate
+run_value_iteration per goal on the same collision map, and prints both wall
+times, their ratio and the largest V / policy difference between the two.
+
+    python -m benchmarks.multi_goal [--goals 4]
+"""
+import argparse
+import contextlib
+import io
+import time
+import numpy as np
+from src import config
+from src.environment import Environment
+from src.planning import ValueIterationPlanner
+from src.simulation import random_free_starts
+
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def solve_separately(env, collision_map, goal_state):
+    planner = quiet(ValueIterationPlanner, env)
+    planner.collision_map = collision_map
+    planner.goal_map[:] = False
+    planner.goal_map[goal_state] = True
+    start = time.time()
+    quiet(planner.solve, 'value_iteration', save=False)
+    return planner, time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--goals', type=int, default=len(config.GOAL_STATES), help="number of goals to solve")
+    args = parser.parse_args()
+
+    env = Environment()
+    planner = quiet(ValueIterationPlanner, env)
+    quiet(planner.precompute_collision_map)
+    goal_states = [tuple(g) for g in config.GOAL_STATES[:args.goals]]
+    if args.goals > len(goal_states):
+        extra = random_free_starts(planner, args.goals - len(goal_states), seed=0)
+        goal_states += [tuple(int(v) for v in s) for s in extra]
+
+    start = time.time()
+    quiet(planner.solve, 'multi_goal', goal_states=goal_states, save=False)
+    batched_time = time.time() - start
+
+    print(f"{'goal':<16} {'time':>9} {'max |dV|':>10} {'policy':>9}")
+    separate_time = 0.0
+    for k, goal_state in enumerate(goal_states):
+        single, elapsed = solve_separately(env, planner.collision_map, goal_state)
+        separate_time += elapsed
+        v_diff = np.abs(single.V - planner.goal_policies.V[k]).max()
+        agree = np.mean(single.policy == planner.goal_policies.policy[k]) * 100
+        print(f"{str(goal_state):<16} {elapsed:>8.2f}s {v_diff:>10.2e} {agree:>8.3f}%")
+
+    print(f"\n{len(goal_states)} goals: batched {batched_time:.2f}s, separate {separate_time:.2f}s "
+          f"({100 * batched_time / separate_time:.0f}% of the separate time)")
+
+
+if __name__ == "__main__":
+    main()
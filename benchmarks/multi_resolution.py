@@ -0,0 +1,67 @@
+"""
+Coarse-to-fine vs single-resolution planning.
+
+Times a cold single-resolution value iteration and the multi-resolution solver
+(full warm start and corridor-restricted, for a few corridor radii), and reports
+the discrete success rate from the start states used by main.py and from random
+free start states.
+
+    python -m benchmarks.multi_resolution [--random N] [--seed S]
+"""
+import argparse
+import contextlib
+import io
+import numpy as np
+from src import config
+from src.environment import Environment
+from src.planning import ValueIterationPlanner
+from src.tables import dense
+
+MAIN_START_STATES = [(10, 10, 0), (50, 50, 18), (70, 72, 0)]
+
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def success_rate(planner, start_states):
+    outcomes = planner.policy_rollouts(start_states)
+    return 100.0 * sum(o == 'goal' for o in outcomes) / len(outcomes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--random', type=int, default=1000, help="number of random free start states")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    env = Environment()
+    reference = quiet(ValueIterationPlanner, env)
+    quiet(reference.precompute_collision_map)
+    collision_map = reference.collision_map
+
+    rng = np.random.default_rng(args.seed)
+    free = np.argwhere(~dense(collision_map) & ~dense(reference.goal_map))
+    random_starts = [tuple(s) for s in free[rng.choice(len(free), args.random, replace=False)]]
+
+    runs = [("single resolution", 'value_iteration', {})]
+    runs.append(("multi-res, full domain", 'multi_resolution', {}))
+    for radius in (1, config.MULTIRES_CORRIDOR_RADIUS):
+        runs.append((f"multi-res, corridor r={radius}", 'multi_resolution',
+                     {'start_states': MAIN_START_STATES, 'radius': radius}))
+
+    print(f"{'solver':<28} {'time':>8} {'states swept':>13} {'sweeps':>7} {'fallback':>9} "
+          f"{'main starts':>12} {'random starts':>14}")
+    for name, method, options in runs:
+        planner = quiet(ValueIterationPlanner, env)
+        planner.collision_map = collision_map
+        stats = quiet(planner.solve, method, save=False, **options)
+        swept = stats.get('corridor_states', stats.get('updates', 0) // max(stats['iterations'], 1))
+        print(f"{name:<28} {stats['time']:>7.2f}s {swept:>13} {stats['iterations']:>7} "
+              f"{str(stats.get('fallback', '-')):>9} {success_rate(planner, MAIN_START_STATES):>11.1f}% "
+              f"{success_rate(planner, random_starts):>13.1f}%")
+
+
+if __name__ == "__main__":
+    main()
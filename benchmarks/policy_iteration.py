@@ -0,0 +1,56 @@
+"""
+Policy iteration vs value iteration.
+
+Solves the default map with synchronous value iteration, then with policy
+iteration using exact sparse evaluation and modified policy iteration with a
+few backup counts, and prints improvement steps, backups, wall time and the
+agreement of V and policy with value iteration.
+
+    python -m benchmarks.policy_iteration [--backups K [K ...]]
+"""
+import argparse
+import contextlib
+import io
+import numpy as np
+from src.environment import Environment
+from src.planning import ValueIterationPlanner
+
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--backups', type=int, nargs='+', default=[10, 20, 50],
+                        help="backups per improvement step for modified policy iteration")
+    args = parser.parse_args()
+
+    env = Environment()
+    collision_map = None
+
+    def solve(method, **options):
+        nonlocal collision_map
+        planner = quiet(ValueIterationPlanner, env)
+        if collision_map is None:
+            quiet(planner.precompute_collision_map)
+            collision_map = planner.collision_map
+        planner.collision_map = collision_map
+        return planner, quiet(planner.solve, method, save=False, **options)
+
+    vi, vi_stats = solve('value_iteration')
+    print(f"{'solver':<26} {'iterations':>10} {'backups':>9} {'time':>8} {'max |dV|':>10} {'policy diff':>12}")
+    print(f"{'value iteration':<26} {vi_stats['iterations']:>10} {vi_stats['iterations']:>9} "
+          f"{vi_stats['time']:>7.2f}s {0.0:>10.2e} {0:>12}")
+
+    runs = [('policy iteration (sparse)', {'evaluation': 'sparse'})]
+    runs += [(f"modified PI ({k} backups)", {'evaluation': 'backups', 'backups': k}) for k in args.backups]
+    for name, options in runs:
+        planner, stats = solve('policy_iteration', **options)
+        print(f"{name:<26} {stats['iterations']:>10} {stats['backups']:>9} {stats['time']:>7.2f}s "
+              f"{np.abs(planner.V - vi.V).max():>10.2e} {int(np.count_nonzero(planner.policy != vi.policy)):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Policy query latency and throughput.
+
+Checks that the query service returns the same actions as src.simulation.simulate_policy's
+rounding and clamping on random continuous poses, then measures in-process
+lookups at several batch sizes and round trips through the localhost HTTP and
+Unix socket transports (p50/p99 latency, queries per second), and hot-reloads a
+rewritten model while a client keeps querying.
+
+    python -m benchmarks.policy_service [--model DIR] [--requests N]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+from src import config
+from src.policy_service import PolicyClient, PolicyService, latest_model, make_server
+
+
+def reference_actions(policy, states):
+    # The lookup of src.simulation.simulate_policy, one pose at a time
+    actions = []
+    for x, y, theta in states:
+        ix = max(0, min(int(np.round(x)), config.NX - 1))
+        iy = max(0, min(int(np.round(y)), config.NY - 1))
+        actions.append(policy[ix, iy, int(theta)])
+    return np.array(actions)
+
+
+def percentiles(latencies):
+    latencies = 1e3 * np.asarray(latencies)
+    return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--model', default=None, help="model directory (default: newest model in the cache)")
+    parser.add_argument('--requests', type=int, default=2000, help="requests per transport and batch size")
+    args = parser.parse_args()
+
+    model = args.model or latest_model()
+    if model is None:
+        raise SystemExit(f"No solved model in {config.CACHE_DIR}, run main.py first")
+    # Work on a copy so the hot-reload check can rewrite it
+    scratch = tempfile.mkdtemp()
+    served = os.path.join(scratch, 'model')
+    shutil.copytree(model, served)
+
+    service = PolicyService(served, reload_interval=0.05)
+    rng = np.random.default_rng(0)
+    n = 100000
+    # Includes poses outside the grid to exercise the clamping
+    states = np.column_stack([rng.uniform(-2, config.NX + 1, n), rng.uniform(-2, config.NY + 1, n),
+                              rng.integers(0, config.N_THETA, n)])
+    actions, _ = service.query(states)
+    mismatches = int(np.count_nonzero(actions != reference_actions(service.table.policy, states)))
+    print(f"{n} random poses: {mismatches} mismatches with simulate_policy's lookup")
+
+    print(f"\n{'transport':<10} {'batch':>6} {'p50 (ms)':>9} {'p99 (ms)':>9} {'queries/s':>12}")
+    for batch in (1, 100, 10000):
+        latencies = []
+        for i in range(args.requests):
+            start = time.perf_counter()
+            service.query(states[(i * batch) % n:][:batch])
+            latencies.append(time.perf_counter() - start)
+        p50, p99 = percentiles(latencies)
+        print(f"{'in-process':<10} {batch:>6} {p50:>9.4f} {p99:>9.4f} {batch * len(latencies) / sum(latencies):>12.0f}")
+
+    socket_path = os.path.join(scratch, 'policy.sock')
+    for transport, kwargs in (('http', {'port': 0}), ('unix', {'unix': socket_path})):
+        server = make_server(service, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        client_kwargs = {'unix': socket_path} if transport == 'unix' else {'port': server.server_address[1]}
+        client = PolicyClient(**client_kwargs)
+        for batch in (1, 100, 1000):
+            latencies = []
+            for i in range(args.requests // (10 if batch == 1000 else 1)):
+                start = time.perf_counter()
+                client.query(states[(i * batch) % n:][:batch])
+                latencies.append(time.perf_counter() - start)
+            p50, p99 = percentiles(latencies)
+            print(f"{transport:<10} {batch:>6} {p50:>9.4f} {p99:>9.4f} {batch * len(latencies) / sum(latencies):>12.0f}")
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+    # Hot reload: rewrite the served model (flipped policy) while a client keeps querying
+    service.start_watcher()
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = PolicyClient(port=server.server_address[1])
+    probe = states[:1000]
+    before, _ = client.query(probe)
+    flipped = np.where(service.table.policy >= 0, 2 - np.asarray(service.table.policy), -1)
+    tmp = served + '.tmp'
+    shutil.copytree(served, tmp)
+    np.save(os.path.join(tmp, 'policy.npy'), flipped.astype(service.table.policy.dtype))
+    shutil.rmtree(served)
+    os.replace(tmp, served)
+    errors, start = 0, time.perf_counter()
+    while time.perf_counter() - start < 2.0:
+        try:
+            after, _ = client.query(probe)
+        except Exception:
+            errors += 1
+            continue
+        if not np.array_equal(after, before):
+            break
+    swapped = np.array_equal(after, np.where(before >= 0, 2 - before, -1))
+    print(f"\nHot reload: new model served after {time.perf_counter() - start:.3f}s, "
+          f"{errors} failed requests, answers match the new model: {swapped}")
+    stats = client.stats()
+    print(f"Service stats: {stats['requests']} requests, p50 {stats['p50_ms']:.4f} ms, "
+          f"p99 {stats['p99_ms']:.4f} ms, {stats['reloads']} reloads")
+    client.close()
+    service.stop()
+    server.shutdown()
+    server.server_close()
+    shutil.rmtree(scratch)
+
+
+if __name__ == "__main__":
+    main()
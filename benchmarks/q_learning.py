@@ -0,0 +1,64 @@
+"""
+Q-learning vs value iteration.
+
+Solves the default map with value iteration, measures its discrete success rate
+from random free start states, then trains the lockstep Q-learning planner until
+its greedy policy reaches the same success rate (or the episode budget runs
+out) and prints the learning curve and the wall time to reach fractions of the
+VI success rate.
+
+    python -m benchmarks.q_learning [--episodes N] [--envs N] [--eval-every N]
+"""
+import argparse
+import contextlib
+import io
+import time
+from src.environment import Environment
+from src.planning import ValueIterationPlanner
+from src.qlearning import QLearningPlanner
+from src.simulation import random_free_starts
+
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--episodes', type=int, default=2000000, help="episode budget for Q-learning")
+    parser.add_argument('--envs', type=int, default=None, help="parallel environments (default Q_N_ENVS)")
+    parser.add_argument('--eval-every', type=int, default=50000, help="episodes between evaluations")
+    parser.add_argument('--starts', type=int, default=1000, help="random start states for the success rate")
+    args = parser.parse_args()
+
+    env = Environment()
+    vi = quiet(ValueIterationPlanner, env)
+    quiet(vi.precompute_collision_map)
+    start = time.time()
+    quiet(vi.solve, 'value_iteration', save=False)
+    vi_time = time.time() - start
+    outcomes = vi.policy_rollouts(random_free_starts(vi, args.starts))
+    vi_success = outcomes.count('goal') / len(outcomes)
+    print(f"Value iteration: {vi_time:.2f}s, success rate {100 * vi_success:.1f}%")
+
+    ql = quiet(QLearningPlanner, env, n_envs=args.envs)
+    ql.collision_map = vi.collision_map
+    stats = ql.run_q_learning(n_episodes=args.episodes, eval_every=args.eval_every, eval_starts=args.starts,
+                              target_success=vi_success, save=False)
+
+    print(f"\n{'episodes':>10} {'steps':>12} {'time':>9} {'epsilon':>8} {'return':>8} {'goal eps':>9} {'greedy':>8}")
+    for p in stats['curve']:
+        print(f"{p['episodes']:>10} {p['steps']:>12} {p['time']:>8.1f}s {p['epsilon']:>8.3f} "
+              f"{p['mean_return']:>8.2f} {100 * p['episode_goal_rate']:>8.2f}% {100 * p['success_rate']:>7.1f}%")
+
+    print(f"\nQ-learning: {stats['episodes_per_second']:.0f} episodes/s, "
+          f"{stats['steps'] / stats['time']:.0f} steps/s")
+    for fraction in (0.25, 0.5, 0.9, 1.0):
+        reached = [p for p in stats['curve'] if p['success_rate'] >= fraction * vi_success]
+        when = f"{reached[0]['time']:.1f}s ({reached[0]['episodes']} episodes)" if reached else "not reached"
+        print(f"  {int(100 * fraction):>3}% of the VI success rate: {when}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Benchmark suite for the planner, environment and visualizer hot paths.
+
+Times Environment.is_collision (both backends) and Environment.step (discrete
+and continuous), precompute_collision_map, one Bellman sweep, a full
+run_value_iteration, extract_policy, simulate_policy (both modes),
+plot_static_path and animate_path on every combination of grid size and heading
+resolution. The default map is scaled to each grid size (obstacles, goal and
+robot footprint), every random input comes from a fixed seed and the cache is
+disabled. Results are written as JSON and compared with a stored baseline:
+cases slower than the baseline by more than the tolerance are flagged and make
+the exit status non-zero.
+
+Every timed run is preceded by a fixed reference workload, and cases are
+compared on their median time divided by the median reference time. This
+cancels much of the load of a shared machine: on one busy core, runs of an
+unchanged tree differed by up to 2.3x in absolute time but at most 2.0x
+relative, hence the default tolerance of 150% (a case is flagged once it takes
+2.5 times its baseline).
+The ratio still depends on the CPU, Python and NumPy, so the committed
+baseline.json (recorded after the last optimization) is only a reference for
+the setup in its meta; elsewhere run --save-baseline first.
+
+    python -m benchmarks.suite [--grids 50,100] [--headings 36,72] [--repeat 5] [--output FILE]
+                               [--baseline FILE] [--save-baseline] [--tolerance 1.5]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import numpy as np
+from src import config
+from src.environment import Environment
+from src.planning import ValueIterationPlanner
+from src.simulation import random_free_starts
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+SCALED = ('NX', 'NY', 'N_THETA', 'DELTA_THETA_DEG', 'DELTA_THETA_RAD', 'ROBOT_LENGTH', 'ROBOT_WIDTH',
+          'GOAL_POS', 'GOAL_THETA_IDX', 'GOAL_STATE', 'GOAL_STATES', 'OBSTACLES_VERTICES', 'CACHE_DIR')
+
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+@contextlib.contextmanager
+def scaled_config(grid, n_theta):
+    # The default map and robot scaled to a grid x grid world with n_theta headings
+    saved = {name: getattr(config, name) for name in SCALED}
+    scale = grid / saved['NX']
+    config.NX = config.NY = grid
+    config.N_THETA = n_theta
+    config.DELTA_THETA_DEG = 360.0 / n_theta
+    config.DELTA_THETA_RAD = np.deg2rad(config.DELTA_THETA_DEG)
+    config.ROBOT_LENGTH, config.ROBOT_WIDTH = saved['ROBOT_LENGTH'] * scale, saved['ROBOT_WIDTH'] * scale
+    config.GOAL_POS = tuple(min(grid - 1, int(round(c * scale))) for c in saved['GOAL_POS'])
+    config.GOAL_THETA_IDX = int(270.0 / config.DELTA_THETA_DEG)
+    config.GOAL_STATE = config.GOAL_POS + (config.GOAL_THETA_IDX,)
+    config.GOAL_STATES = [config.GOAL_STATE]
+    config.OBSTACLES_VERTICES = [[(x * scale, y * scale) for x, y in v] for v in saved['OBSTACLES_VERTICES']]
+    config.CACHE_DIR = ''
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(config, name, value)
+
+
+def reference_work():
+    # Fixed mix of interpreter and NumPy work, timed right before every run of a case
+    np.sort(np.random.default_rng(0).random(200000))
+    sum(i * i for i in range(100000))
+
+
+def reference_time(runs=3):
+    # Fastest of a few back-to-back runs: a single ~10 ms run is itself too noisy
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        reference_work()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(fn, repeat, number=1):
+    # (median seconds per call, median seconds / median reference seconds) over
+    # `repeat` runs of `number` calls. The ratio cancels how busy the machine was
+    times, references = [], []
+    for _ in range(repeat):
+        references.append(reference_time())
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return statistics.median(times), statistics.median(times) / statistics.median(references)
+
+
+def run_cases(grid, n_theta, repeat, frames):
+    from src.simulation import simulate_policy
+    from src.visualizer import animate_path, plot_static_path
+
+    results = []
+
+    def record(case, measured, per_call=1, **extra):
+        seconds, relative = measured
+        row = {'case': case, 'grid': grid, 'n_theta': n_theta, 'seconds': seconds / per_call,
+               'relative': relative / per_call}
+        row.update(extra)
+        seconds /= per_call
+        results.append(row)
+        print(f"  {case:<28} {1e3 * seconds:>12.3f} ms")
+
+    rng = np.random.default_rng(0)
+    n = 2000
+    states = list(zip(rng.uniform(0, grid, n), rng.uniform(0, grid, n), rng.integers(0, n_theta, n).tolist()))
+    actions = rng.integers(0, config.N_ACTIONS, n).tolist()
+
+    for backend in ('sat', 'shapely'):
+        env = Environment(collision_backend=backend)
+        env.is_collision(states[0])  # build the checker outside the timing
+        record(f'is_collision[{backend}]', measure(lambda: [env.is_collision(s) for s in states], repeat), n)
+    env = Environment()
+    for continuous in (False, True):
+        mode = 'continuous' if continuous else 'discrete'
+        record(f'step[{mode}]', measure(
+            lambda: [env.step(s, a, continuous=continuous) for s, a in zip(states, actions)], repeat), n)
+
+    planner = quiet(ValueIterationPlanner, env)
+    record('precompute_collision_map', measure(lambda: quiet(planner.precompute_collision_map), repeat))
+    planner.build_transition_tables()
+    V = planner.V.reshape(-1)
+    record('bellman_sweep', measure(lambda: planner._q_table(V).max(axis=0), repeat),
+           states=int(V.size))
+    # Every run starts from zeros, as a second run would start from the converged V
+    stats = {}
+
+    def cold_value_iteration():
+        planner.V = np.zeros_like(planner.V)
+        stats.update(quiet(planner.run_value_iteration, save=False, checkpoint_every=0))
+
+    record('run_value_iteration', measure(cold_value_iteration, min(repeat, 3)),
+           iterations=stats['iterations'])
+    record('extract_policy', measure(lambda: quiet(planner.extract_policy), repeat))
+
+    starts = [tuple(int(v) for v in s) for s in random_free_starts(planner, 5, seed=0)]
+    paths = []
+    for continuous in (False, True):
+        mode = 'continuous' if continuous else 'discrete'
+        paths = [quiet(simulate_policy, planner, env, s, continuous_mode=continuous) for s in starts]
+        rollouts = lambda: [quiet(simulate_policy, planner, env, s, continuous_mode=continuous) for s in starts]
+        record(f'simulate_policy[{mode}]', measure(rollouts, repeat), len(starts),
+               steps=int(np.mean([len(p) for p in paths])))
+
+    # Rendering writes its files to the working directory: use a scratch one
+    path = max(paths, key=len)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            record('plot_static_path', measure(lambda: quiet(plot_static_path, env, path, 'bench'), repeat))
+            clip = path[:frames]
+            record('animate_path', measure(lambda: quiet(animate_path, env, clip, 'bench'), repeat),
+                   frames=len(clip))
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def key(row):
+    return f"{row['case']}@{row['grid']}x{row['grid']}x{row['n_theta']}"
+
+
+def compare(results, baseline, tolerance):
+    # (key, baseline seconds, new seconds, ratio) of every case present in both. The
+    # ratio is of the times relative to the reference work when both runs have them
+    reference = {key(row): row for row in baseline['results']}
+    rows = []
+    for row in results:
+        if key(row) in reference:
+            old = reference[key(row)]
+            name = 'relative' if 'relative' in old and 'relative' in row else 'seconds'
+            ratio = row[name] / old[name] if old[name] > 0 else float('inf')
+            rows.append((key(row), old['seconds'], row['seconds'], ratio))
+    print(f"\n{'case':<44} {'baseline':>12} {'now':>12} {'ratio':>7}")
+    regressions = []
+    for name, old, new, ratio in rows:
+        flag = ''
+        if ratio > 1 + tolerance:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<44} {1e3 * old:>10.3f}ms {1e3 * new:>10.3f}ms {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--grids', default='50,100', help="comma separated grid sizes (NX = NY)")
+    parser.add_argument('--headings', default='36,72', help="comma separated heading resolutions (N_THETA)")
+    parser.add_argument('--repeat', type=int, default=5, help="timed repetitions per case (median)")
+    parser.add_argument('--frames', type=int, default=30, help="frames rendered by the animate_path case")
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON results file")
+    parser.add_argument('--baseline', default=BASELINE, help="baseline results to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=1.5, help="allowed slowdown before flagging (1.5 = 150%%)")
+    args = parser.parse_args()
+
+    results = []
+    for grid in (int(g) for g in args.grids.split(',')):
+        for n_theta in (int(t) for t in args.headings.split(',')):
+            print(f"\nGrid {grid}x{grid}x{n_theta}")
+            with scaled_config(grid, n_theta):
+                results.extend(run_cases(grid, n_theta, args.repeat, args.frames))
+
+    report = {
+        'meta': {'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': sys.version.split()[0],
+                 'numpy': np.__version__, 'platform': platform.platform(), 'machine': platform.machine(),
+                 'repeat': args.repeat},
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=1)
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    recorded = {name: baseline['meta'].get(name) for name in ('platform', 'python', 'numpy')}
+    if recorded != {name: report['meta'][name] for name in recorded}:
+        print(f"\nThe baseline was recorded on another setup ({recorded['platform']}, Python {recorded['python']}, "
+              f"NumPy {recorded['numpy']}): ratios include the machine difference")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {100 * args.tolerance:.0f}%")
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Out-of-core tiled value iteration against the in-memory planner.
+
+Solves the default map scaled to each grid size with the tiled solver and
+reports passes, tile visits, I/O volume, resident memory and time next to the
+memory the dense planner tables would need. On grids up to --compare-max the
+in-memory value iteration is run as well and the tiled V and policy are
+compared with it.
+
+    python -m benchmarks.tiled [--grids 100,500] [--tile 64] [--workers N] [--compare-max 100]
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+import numpy as np
+from src.environment import Environment
+from src.planning import ValueIterationPlanner
+from src.tables import format_bytes
+from src.tiled import solve_tiled
+from src.transitions import TransitionModel
+from benchmarks.suite import scaled_config
+
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--grids', default='100,500', help="comma separated grid sizes (NX = NY)")
+    parser.add_argument('--headings', type=int, default=72, help="heading resolution (N_THETA)")
+    parser.add_argument('--tile', type=int, default=None, help="tile edge in cells (default TILED_TILE_SIZE)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default TILED_WORKERS)")
+    parser.add_argument('--compare-max', type=int, default=100,
+                        help="largest grid also solved in memory for comparison")
+    args = parser.parse_args()
+
+    print(f"{'grid':>14} {'passes':>7} {'visits':>7} {'read':>10} {'written':>10} {'resident':>10} "
+          f"{'dense tables':>13} {'time':>9}")
+    for grid in (int(g) for g in args.grids.split(',')):
+        with scaled_config(grid, args.headings), tempfile.TemporaryDirectory() as scratch:
+            env = Environment()
+            stats = quiet(solve_tiled, env, scratch, args.tile, args.workers)
+            # What ValueIterationPlanner would hold: V, policy, collision/goal maps and transition tables
+            dense_bytes = grid * grid * args.headings * (8 + 8 + 1 + 1 + TransitionModel.bytes_per_state())
+            print(f"{f'{grid}x{grid}x{args.headings}':>14} {stats['iterations']:>7} {stats['tile_visits']:>7} "
+                  f"{format_bytes(stats['bytes_read']):>10} {format_bytes(stats['bytes_written']):>10} "
+                  f"{format_bytes(stats['resident_memory']):>10} {format_bytes(dense_bytes):>13} "
+                  f"{stats['time']:>8.2f}s")
+            if grid > args.compare_max:
+                continue
+            planner = quiet(ValueIterationPlanner, env)
+            quiet(planner.precompute_collision_map, method='raster')
+            start = time.perf_counter()
+            vi = quiet(planner.run_value_iteration, save=False, checkpoint_every=0)
+            seconds = time.perf_counter() - start
+            V = np.load(f"{scratch}/v.npy")
+            policy = np.load(f"{scratch}/policy.npy")
+            print(f"{'':>14} in memory: {vi['iterations']} sweeps in {seconds:.2f}s, "
+                  f"max |V difference| {np.abs(V - planner.V).max():.2e}, "
+                  f"policy mismatches {int(np.count_nonzero(policy != planner.policy))}")
+
+
+if __name__ == "__main__":
+    main()
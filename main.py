@@ -1,141 +1,263 @@
-from src.environment import Environment
-from src.planning import ValueIterationPlanner
-from src.visualizer import plot_static_path, animate_path
-from src import config 
+"""
+Plan, test, simulate and render the parking policy.
+
+Without a subcommand the full pipeline runs: load or train the model, run the
+policy tests, simulate the default scenarios and render every plot. The
+subcommands run one phase on their own and only import what it needs, so a
+simulation against a cached model starts in well under a second:
+
+    python main.py [--batch-eval N]
+    python main.py plan [--method value_iteration] [--force]
+    python main.py simulate [--start X,Y,THETA ...] [--mode discrete|continuous|both] [--random N]
+    python main.py render [--start X,Y,THETA ...] [--mode ...] [--no-animate] [--maps] [--workers N]
+    python main.py test [--starts N]
+    python main.py bench [NAME] [ARGS ...]
+"""
+import time
+_START = time.perf_counter()
+# Planner, Shapely, SciPy and Matplotlib are imported by the phases that need them
 import numpy as np
+from src import config
+from src.instrumentation import recorder
+from src.simulation import exact_collision_map, random_free_starts, run_policy_tests, simulate_batch, simulate_policy
 
-def simulate_policy(planner, env, start_state, continuous_mode=False):
-    mode_str = "CONTINUOUS" if continuous_mode else "DISCRETE"
-    print(f"\n Starting {mode_str} Simulation from {start_state} ")
-
-    path = [start_state]
-    current_state = start_state
-    max_steps = config.NX * config.NY 
-
-    for i in range(max_steps):
-        x, y, theta = current_state
-
-        ix = int(np.round(x))
-        iy = int(np.round(y))
-        ix = max(0, min(ix, config.NX - 1))
-        iy = max(0, min(iy, config.NY - 1))
-
-        action = planner.policy[ix, iy, theta]
-
-        if action == -1:
-            if env.is_goal(current_state):
-                print(f"RESULT: SUCCESS! Goal reached in {i} steps.")
-            else:
-                print(f"RESULT: FAILURE. Policy -1 (Stall/Collision) at {current_state} in {i} steps.")
-            break 
-
-        next_state, reward, terminated = env.step(current_state, action, continuous=continuous_mode)
-        path.append(next_state)
-        current_state = next_state
-
-        if terminated:
-            if env.is_goal(current_state):
-                print(f"RESULT: SUCCESS! Goal reached in {i+1} steps.")
-            else:
-                print(f"RESULT: COLLISION! (State {current_state}) in {i+1} steps.")
-            break
-    else:
-        print(f"RESULT: TIMEOUT! {max_steps} steps limit reached.")
-
-    # Path summary for quick debugging
-    if len(path) > 10:
-        print("Path (first 5):")
-        for j in range(5): print(f"  {j}: {path[j]}")
-        print("  ...")
-        print("Path (last 5):")
-        for j in range(len(path) - 5, len(path)): print(f"  {j}: {path[j]}")
-    else:
-        print("Path:")
-        for j, state in enumerate(path): print(f"  {j}: {state}")
-            
-    return path
-
-def run_policy_tests(planner):
-    print("\nStarting Optimal Policy Tests")
-    
-    # Test cases format: (name, state, assertion_lambda)
-    test_cases = [
-        ("Collision State (30, 30, 0)", (30, 30, 0), lambda p: p == -1),
-        ("Goal State", config.GOAL_STATE, lambda p: p == -1),
-        ("Safe State (10, 10, 0)", (10, 10, 0), lambda p: p != -1),
-        ("Safe State (50, 50, 18)", (50, 50, 18), lambda p: p != -1),
-        # Specific scenarios near goal might need adjustment if goal coords change
-        ("Pre-Goal (forward)", (82, 94, config.GOAL_STATE[2]), lambda p: p == config.ACTIONS['MOVE_FORWARD']),
-    ]
-    
-    success_count = 0
-    for name, state, test_lambda in test_cases:
-        try:
-            x, y, theta = state
-            # Handle potential out-of-bounds if test cases are bad
-            if not (0 <= x < config.NX and 0 <= y < config.NY):
-                 print(f"[ERROR]   Test '{name}': State {state} out of bounds!")
-                 continue
-
-            policy_action = planner.policy[x, y, theta]
-            if test_lambda(policy_action):
-                print(f"[SUCCESS] Test '{name}': Correct (Action: {policy_action})")
-                success_count += 1
-            else:
-                print(f"[FAILED]  Test '{name}': Failed (Action: {policy_action})")
-        except Exception as e:
-            print(f"[ERROR]   Test '{name}': Exception! {e}")
-            
-    print("Policy Tests Completed")
-    print(f"Result: {success_count} / {len(test_cases)} tests passed.")
-    
-    unique, counts = np.unique(planner.policy, return_counts=True)
-    print("\nPolicy Action Summary:")
-    for action, count in zip(unique, counts):
-        print(f"  Action {action}: {count} states")
+DEFAULT_STARTS = [(10, 10, 0), (50, 50, 18), (70, 72, 0)]
+
+def run_batch_evaluation(planner, env, n_starts=1000, mode='both'):
+    # Success rate of the policy over random free start states
+    start_states = random_free_starts(planner, n_starts)
+    print(f"\nBatch evaluation over {len(start_states)} random start states")
+    for continuous_mode in modes(mode):
+        mode_str = "Continuous" if continuous_mode else "Discrete"
+        result = simulate_batch(planner, env, start_states, continuous_mode=continuous_mode,
+                                collision_map=exact_collision_map(planner))
+        print(f"  {mode_str}: {result.summary()}")
+
+def create_planner():
+    from src.environment import Environment
+    from src.planning import ValueIterationPlanner
 
-if __name__ == "__main__":
     env = Environment()
     print("Environment created.")
 
     planner = ValueIterationPlanner(env)
     print("Planner created.")
+    return env, planner
+
+def load_planner(collision_map=False):
+    # Environment and planner with the cached model; exits if nothing is cached for this config
+    env, planner = create_planner()
+    if not planner.load_model():
+        raise SystemExit("No cached model for the current config, run `python main.py plan` first.")
+    if collision_map:
+        planner.precompute_collision_map()
+    print(f"Cold start: ready in {time.perf_counter() - _START:.3f}s")
+    return env, planner
+
+def run_pipeline(batch_starts=0):
+    from src.rendering import map_jobs, render_batch, scenario_jobs
+
+    env, planner = create_planner()
 
     # Try loading first, otherwise train from scratch
     if not planner.load_model():
         print("No saved model found. Starting pre-computation and training...")
         planner.precompute_collision_map()
-        planner.run_value_iteration()
+        planner.run_value_iteration(resume=True)
     else:
-        print("Models loaded. Re-running pre-computation for collision map...")
-        # We need the collision map for simulation, even if V is loaded
+        print("Models loaded. Loading collision map...")
+        # We need the collision map for simulation, even if V is loaded.
+        # It is cached under the same config, so this is a memory-mapped load.
         planner.precompute_collision_map()
 
     run_policy_tests(planner)
+    if batch_starts:
+        run_batch_evaluation(planner, env, batch_starts)
 
     print("\n RUNNING SIMULATIONS AND VISUALIZATION")
 
     # Simulation scenarios
-    start_states = [
-        (10, 10, 0),
-        (50, 50, 18),
-        (70, 72, 0)
-    ]
+    start_states = DEFAULT_STARTS
 
+    # Simulate first, then render every plot in one parallel batch
+    jobs = []
     for i, start_state in enumerate(start_states, 1):
         if planner.policy[start_state] != -1:
             
             #SIMULAZIONE 1: DISCRETA
             print(f"--- Running Discrete Sim {i} ---")
             path_disc = simulate_policy(planner, env, start_state, continuous_mode=False)
-            plot_static_path(env, path_disc, title=f"Sim_{i}_Discrete_{start_state}")
-            animate_path(env, path_disc, title=f"Anim_{i}_Discrete_{start_state}")
+            jobs += scenario_jobs(f"{i}_Discrete_{start_state}", path_disc)
 
             # SIMULAZIONE 2: CONTINUA
             print(f"--- Running Continuous Sim {i} ---")
             path_cont = simulate_policy(planner, env, start_state, continuous_mode=True)
-            plot_static_path(env, path_cont, title=f"Sim_{i}_Continuous_{start_state}")
-            animate_path(env, path_cont, title=f"Anim_{i}_Continuous_{start_state}")
+            jobs += scenario_jobs(f"{i}_Continuous_{start_state}", path_cont)
 
         else:
-            print(f"\nSkipping simulation from {start_state} (Invalid starting policy -1)")
\ No newline at end of file
+            print(f"\nSkipping simulation from {start_state} (Invalid starting policy -1)")
+
+    # Value heatmaps and policy maps for a few headings, from the memory-mapped model
+    jobs += map_jobs()
+    render_batch(env, jobs, V=planner.V, policy=planner.policy)
+
+def profiled(run, mode, output=None):
+    """
+    Runs `run()` under cProfile ('cprofile') or, if the optional line_profiler
+    package is installed, line by line over the solver and simulation hot paths
+    ('lines'). Prints the report and saves the raw stats to `output`.
+    """
+    if mode == 'cprofile':
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        profiler.runcall(run)
+        stats = pstats.Stats(profiler).sort_stats('cumulative')
+        stats.print_stats(30)
+        if output:
+            stats.dump_stats(output)
+            print(f"Profile saved to {output}")
+        return
+    try:
+        from line_profiler import LineProfiler
+    except ImportError:
+        raise SystemExit("Line-level profiling needs the line_profiler package (pip install line_profiler)")
+    from src import transitions
+    from src.environment import Environment
+    from src.planning import ValueIterationPlanner
+    profiler = LineProfiler(ValueIterationPlanner.run_value_iteration, ValueIterationPlanner.extract_policy,
+                            transitions.q_values, simulate_policy.__wrapped__, Environment.step)
+    profiler.runcall(run)
+    profiler.print_stats()
+    if output:
+        profiler.dump_stats(output)
+        print(f"Profile saved to {output}")
+
+def parse_state(text):
+    # "x,y,theta_idx"; integral positions stay ints, like the pipeline scenarios
+    x, y, theta = (float(v) for v in text.split(','))
+    return tuple(int(v) if v.is_integer() else v for v in (x, y)) + (int(theta),)
+
+def modes(mode):
+    return {'discrete': [False], 'continuous': [True], 'both': [False, True]}[mode]
+
+def simulate_scenarios(planner, env, start_states, mode):
+    # [(name, path)] for every start state and mode, skipping starts without an action
+    paths = []
+    for i, start_state in enumerate(start_states, 1):
+        cell = tuple(int(v) for v in np.round(start_state))
+        if planner.policy[min(max(cell[0], 0), config.NX - 1), min(max(cell[1], 0), config.NY - 1), cell[2]] == -1:
+            print(f"\nSkipping simulation from {start_state} (Invalid starting policy -1)")
+            continue
+        for continuous_mode in modes(mode):
+            mode_str = "Continuous" if continuous_mode else "Discrete"
+            path = simulate_policy(planner, env, start_state, continuous_mode=continuous_mode)
+            paths.append((f"{i}_{mode_str}_{start_state}", path))
+    return paths
+
+def cmd_plan(args):
+    env, planner = create_planner()
+    if args.method == 'tiled':
+        # The tiled solver builds the raster collision map tile by tile
+        planner.collision_method = 'raster'
+    if not args.force and planner.load_model():
+        print("A model for the current config is already cached (use --force to solve again).")
+        return
+    if args.method != 'tiled':
+        planner.precompute_collision_map()
+    options = {'resume': True} if args.method == 'value_iteration' else {}
+    planner.solve(args.method, **options)
+
+def cmd_simulate(args):
+    env, planner = load_planner(collision_map=bool(args.random))
+    simulate_scenarios(planner, env, args.start or DEFAULT_STARTS, args.mode)
+    if args.random:
+        run_batch_evaluation(planner, env, args.random, args.mode)
+
+def cmd_render(args):
+    from src.rendering import map_jobs, render_batch, scenario_jobs
+
+    env, planner = load_planner()
+    jobs = []
+    for name, path in simulate_scenarios(planner, env, args.start or DEFAULT_STARTS, args.mode):
+        jobs += scenario_jobs(name, path, animate=not args.no_animate)
+    if args.maps:
+        jobs += map_jobs(args.headings)
+    if jobs:
+        render_batch(env, jobs, V=planner.V, policy=planner.policy, workers=args.workers)
+
+def cmd_test(args):
+    env, planner = load_planner(collision_map=True)
+    passed, total = run_policy_tests(planner)
+    run_batch_evaluation(planner, env, args.starts)
+    if passed < total:
+        raise SystemExit(1)
+
+def cmd_bench(args):
+    # Runs benchmarks.<name> with the remaining arguments
+    import importlib
+    import sys
+    module = importlib.import_module(f"benchmarks.{args.name}")
+    sys.argv = [f"benchmarks/{args.name}.py"] + args.args
+    module.main()
+
+def build_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--telemetry', metavar='FILE', help="stream instrumentation events to FILE as JSON lines")
+    parser.add_argument('--profile', choices=('cprofile', 'lines'), help="profile the run")
+    parser.add_argument('--profile-output', metavar='FILE', help="save the raw profile to FILE")
+    parser.add_argument('--batch-eval', type=int, default=0, metavar='N',
+                        help="without a command, also report success rates over N random start states")
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+
+    plan = commands.add_parser('plan', help="solve and cache the model for the current config")
+    plan.add_argument('--method', default='value_iteration',
+                      choices=('value_iteration', 'backward_dijkstra', 'prioritized_sweeping', 'multi_resolution',
+                               'multi_goal', 'policy_iteration', 'tiled'))
+    plan.add_argument('--force', action='store_true', help="solve even if a cached model exists")
+    plan.set_defaults(run=cmd_plan)
+
+    for name, run, text in (('simulate', cmd_simulate, "simulate the cached policy from start states"),
+                            ('render', cmd_render, "simulate and render paths, GIFs and V/policy maps")):
+        sub = commands.add_parser(name, help=text)
+        sub.add_argument('--start', action='append', type=parse_state, metavar='X,Y,THETA',
+                         help="start state, repeatable (default: the three pipeline scenarios)")
+        sub.add_argument('--mode', choices=('discrete', 'continuous', 'both'), default='both')
+        sub.set_defaults(run=run)
+        if name == 'simulate':
+            sub.add_argument('--random', type=int, default=0, metavar='N',
+                             help="also simulate N random free start states in a batch")
+        else:
+            sub.add_argument('--no-animate', action='store_true', help="static plots only, no GIFs")
+            sub.add_argument('--maps', action='store_true', help="also render V heatmaps and policy maps")
+            sub.add_argument('--headings', type=lambda t: [int(v) for v in t.split(',')], default=None,
+                             help="heading indices for --maps (default RENDER_HEADINGS)")
+            sub.add_argument('--workers', type=int, default=None, help="render processes (default RENDER_WORKERS)")
+
+    test = commands.add_parser('test', help="policy tests and batch success rates of the cached model")
+    test.add_argument('--starts', type=int, default=1000, help="random start states for the success rates")
+    test.set_defaults(run=cmd_test)
+
+    bench = commands.add_parser('bench', help="run a benchmark from benchmarks/ (default: suite)")
+    bench.add_argument('name', nargs='?', default='suite')
+    bench.add_argument('args', nargs=argparse.REMAINDER, help="arguments passed to the benchmark")
+    bench.set_defaults(run=cmd_bench)
+    return parser
+
+if __name__ == "__main__":
+    from src.instrumentation import JsonLinesHook
+
+    args = build_parser().parse_args()
+    run = (lambda: args.run(args)) if args.command else (lambda: run_pipeline(args.batch_eval))
+
+    hook = recorder.add_hook(JsonLinesHook(args.telemetry)) if args.telemetry else None
+    if args.profile:
+        profiled(run, args.profile, args.profile_output)
+    else:
+        run()
+    recorder.report()
+    print(f"Total time: {time.perf_counter() - _START:.3f}s")
+    if hook:
+        hook.close()
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+from src import config
+from src.tables import state_indices
+
+
+def _digest(fields):
+    payload = json.dumps(fields, sort_keys=True, default=float)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def collision_fields(env, method=None):
+    # Everything the collision map depends on: grid, headings, footprint and map
+    method = method or config.COLLISION_MAP_METHOD
+    fields = {
+        'shape': [env.nx, env.ny, env.n_theta],
+        'delta_theta_deg': config.DELTA_THETA_DEG,
+        'robot': [config.ROBOT_LENGTH, config.ROBOT_WIDTH],
+        'obstacles': [list(obstacle.exterior.coords) for obstacle in env.obstacles],
+        'method': method,
+    }
+    if method == 'raster':
+        fields['raster_res'] = config.COLLISION_RASTER_RES
+    return fields
+
+
+def model_fields(env, goal_map, collision_method=None):
+    # V/policy additionally depend on the goal, the dynamics and the rewards
+    fields = collision_fields(env, collision_method)
+    fields.update({
+        'goal': state_indices(goal_map).tolist(),
+        'step_size': config.STEP_SIZE,
+        'rewards': [config.R_GOAL, config.R_COLLISION, config.R_STEP, config.R_ROTATE, config.R_DRIFT_PENALTY],
+        'gamma': config.GAMMA,
+        'threshold': config.VI_CONVERGENCE_THRESHOLD,
+    })
+    return fields
+
+
+class ArtifactCache:
+    """
+    Content-addressed store for expensive planner artifacts.
+
+    Every entry lives in `<root>/<kind>-<hash>/` where the hash covers the config
+    fields the artifact depends on, so editing the map or the rewards simply misses
+    the cache instead of loading stale data. Arrays are saved as .npy files and
+    loaded memory-mapped; entries are written to a temporary directory and renamed
+    into place, so an interrupted run never leaves a partial entry behind.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or config.CACHE_DIR
+
+    def path(self, kind, fields):
+        return os.path.join(self.root, f"{kind}-{_digest(fields)}")
+
+    def load(self, kind, fields, names):
+        entry = self.path(kind, fields)
+        files = [os.path.join(entry, f"{name}.npy") for name in names]
+        if not all(os.path.exists(f) for f in files):
+            return None
+        return {name: np.load(f, mmap_mode='r') for name, f in zip(names, files)}
+
+    def store(self, kind, fields, arrays):
+        entry = self.path(kind, fields)
+        tmp = f"{entry}.tmp-{os.getpid()}"
+        os.makedirs(tmp, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), np.asarray(array))
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(fields, f, indent=1, default=float)
+        if os.path.exists(entry):
+            shutil.rmtree(entry)
+        os.replace(tmp, entry)
+        return entry
+
+    def remove(self, kind, fields):
+        entry = self.path(kind, fields)
+        if os.path.exists(entry):
+            shutil.rmtree(entry)
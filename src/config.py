@@ -22,11 +22,70 @@ ACTIONS = {
 N_ACTIONS = len(ACTIONS)
 STEP_SIZE = 1.0
 
+# Collision map construction: 'exact' (Shapely, same results as Environment.is_collision)
+# or 'raster' (faster, conservative: may block a few states the exact map leaves free)
+COLLISION_MAP_METHOD = 'exact'
+COLLISION_RASTER_RES = 8  # raster cells per grid unit
+COLLISION_MAP_WORKERS = 0  # processes for the exact method, 0 = all cores
+
+# Environment.is_collision backend: 'sat' (NumPy separating axis tests, falls
+# back to Shapely on touching contacts and for maps with concave obstacles) or
+# 'shapely'; the results are identical
+COLLISION_BACKEND = 'sat'
+
+# Coarse-to-fine planning: coarse cell size, headings per coarse heading and
+# corridor half-width (in coarse cells) around the coarse optimal paths
+MULTIRES_FACTOR = 2
+MULTIRES_THETA_FACTOR = 2
+MULTIRES_CORRIDOR_RADIUS = 3
+
+# Incremental replanning: the wave repair gives up and re-solves from scratch
+# once its backups exceed REPLAN_MAX_BACKUPS sweeps' worth of free states or it
+# has visited more than REPLAN_MAX_STATES of them
+REPLAN_MAX_BACKUPS = 2.0
+REPLAN_MAX_STATES = 0.25
+
+# Policy iteration: policy evaluation by sparse linear solve ('sparse') or by
+# PI_BACKUPS synchronous backups per improvement step ('backups')
+PI_EVALUATION = 'backups'
+PI_BACKUPS = 20
+
+# animate_path: frames per GIF, long paths are subsampled evenly (0 = every step)
+ANIMATION_MAX_FRAMES = 0
+
+# Batch rendering (src/rendering.py): worker processes (0 = all cores) and the
+# headings drawn as V heatmaps / policy maps (the four axis directions)
+RENDER_WORKERS = 0
+RENDER_HEADINGS = [k * N_THETA // 4 for k in range(4)]
+
+# Policy query service (src/policy_service.py): localhost HTTP port and seconds
+# between checks for a newly solved model (0 = no hot reload)
+SERVICE_PORT = 8765
+SERVICE_RELOAD_INTERVAL = 1.0
+
+# Out-of-core tiled value iteration (src/tiled.py): tile edge in cells, worker
+# processes (0 = all cores), max sweeps per tile visit, memory for the per-tile
+# transition tables kept between visits, and the working/output directory
+TILED_TILE_SIZE = 64
+TILED_WORKERS = 1
+TILED_INNER_SWEEPS = 64
+TILED_TABLE_CACHE_MB = 64
+TILED_DIR = 'tiled'
+
+# Compact planner tables (float32 V, int8 policy, bit-packed collision map)
+COMPACT_TABLES = False
+
+# Content-addressed cache for collision maps and solved models ('' disables it)
+CACHE_DIR = 'cache'
+
 # Goal
 GOAL_POS = (82, 95)
 GOAL_THETA_IDX = int(270.0 / DELTA_THETA_DEG) # 270 degrees
 GOAL_STATE = (GOAL_POS[0], GOAL_POS[1], GOAL_THETA_IDX)
 
+# Parking spots solved together by the multi-goal planner (solve(method='multi_goal'))
+GOAL_STATES = [GOAL_STATE, (20, 50, 0), (60, 80, 18), (50, 15, 36)]
+
 # Obstacles (polygons)
 OBSTACLES_VERTICES = [
     [(0, 30), (70, 30), (70, 35), (0, 35)],      # bottom wall
@@ -48,10 +107,14 @@ R_DRIFT_PENALTY = -90.0
 # RL params
 GAMMA = 0.99
 VI_CONVERGENCE_THRESHOLD = 1e-4
+VI_CHECKPOINT_EVERY = 50  # sweeps between value-iteration checkpoints, 0 = never
 
 ALPHA = 0.1
 EPSILON_START = 1.0
 EPSILON_END = 0.01
 EPSILON_DECAY_STEPS = 10000
 N_EPISODES = 50000
-MAX_STEPS_PER_EPISODE = 500
\ No newline at end of file
+MAX_STEPS_PER_EPISODE = 500
+Q_N_ENVS = 512  # episodes simulated in lockstep by the Q-learning planner
+Q_EVAL_EVERY = 5000  # episodes between greedy-policy evaluations
+Q_INIT = 0.0  # initial Q value of every (state, action)
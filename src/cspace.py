@@ -0,0 +1,476 @@
+import os
+import numpy as np
+import shapely
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src import config
+
+
+def _cover_cells(polygon, res, pad=1, window=None):
+    """
+    Conservative rasterization: returns the integer indices (i, j) of every fine
+    cell [i/res, (i+1)/res] x [j/res, (j+1)/res] that intersects the (closed) polygon.
+    With `window` = (i0, i1, j0, j1) only cells i0 <= i < i1, j0 <= j < j1 are tested.
+    """
+    minx, miny, maxx, maxy = polygon.bounds
+    i0, i1 = int(np.floor(minx * res)) - pad, int(np.ceil(maxx * res)) + pad
+    j0, j1 = int(np.floor(miny * res)) - pad, int(np.ceil(maxy * res)) + pad
+    if window is not None:
+        i0, i1 = max(i0, window[0]), min(i1, window[1])
+        j0, j1 = max(j0, window[2]), min(j1, window[3])
+    i = np.arange(i0, max(i0, i1))
+    j = np.arange(j0, max(j0, j1))
+    # A cell with a corner in the polygon intersects it. Of the others only those
+    # whose center is within a cell diagonal of the boundary can, and only those
+    # are tested as boxes: the cost grows with the perimeter instead of the area.
+    shapely.prepare(polygon)
+    corners = shapely.intersects_xy(polygon, *np.meshgrid(np.append(i, i0 + len(i)) / res,
+                                                          np.append(j, j0 + len(j)) / res, indexing='ij'))
+    hit = corners[:-1, :-1] | corners[1:, :-1] | corners[:-1, 1:] | corners[1:, 1:]
+    ii, jj = np.nonzero(~hit)
+    band = polygon.boundary.buffer(1.0 / res)
+    near = shapely.intersects_xy(band, (i[ii] + 0.5) / res, (j[jj] + 0.5) / res)
+    ii, jj = ii[near], jj[near]
+    boxes = shapely.box(i[ii] / res, j[jj] / res, (i[ii] + 1) / res, (j[jj] + 1) / res)
+    hit[ii, jj] = shapely.intersects(boxes, polygon)
+    ii, jj = np.nonzero(hit)
+    ii, jj = i[ii], j[jj]
+    return ii, jj
+
+
+def _footprint_kernel(footprint, res):
+    # For a convex footprint every fine column is covered by one contiguous run of
+    # rows, so the kernel is stored as (column offset, first row, last row).
+    ki, kj = _cover_cells(footprint, res)
+    runs = []
+    for col in np.unique(ki):
+        rows = kj[ki == col]
+        if rows.max() - rows.min() + 1 != len(rows):
+            raise ValueError("Robot footprint must be convex for the raster C-space builder")
+        runs.append((col, rows.min(), rows.max()))
+    return runs
+
+
+def footprint_kernels(env, res):
+    # (footprint, kernel) of every heading and the raster pad their offsets need
+    footprints = [env._get_robot_footprint((0, 0, theta_idx)) for theta_idx in range(env.n_theta)]
+    kernels = [_footprint_kernel(f, res) for f in footprints]
+    reach = max(max(abs(c) for c, _, _ in k) for k in kernels)
+    reach = max(reach, max(max(abs(lo), abs(hi)) for k in kernels for _, lo, hi in k))
+    return footprints, kernels, reach + 2
+
+
+def build_collision_map_raster(env, res=None, region=None, kernels=None):
+    """
+    Builds the (NX, NY, N_THETA) collision map in bulk.
+
+    The world boundary test is evaluated analytically on the footprint corners,
+    which reproduces `world_boundary.contains` exactly. Obstacles are rasterized
+    once onto a grid `res` times finer than the planner grid and dilated with the
+    rasterized footprint of each heading, using column prefix sums so that each
+    heading costs one gather per footprint column. Both rasterizations cover every
+    cell the shapes touch, so the result is conservative: it never misses a
+    collision reported by `Environment.is_collision`, but can flag states whose
+    footprint passes within about one fine cell of an obstacle.
+
+    `region` = (x0, x1, y0, y1) restricts the output to cells x0 <= x < x1,
+    y0 <= y < y1, with the same values as the corresponding slice of the full map;
+    only the obstacles around the region are rasterized, so the cost and memory
+    grow with the region rather than with the map. `kernels` reuses the result of
+    `footprint_kernels(env, res)` across calls.
+    """
+    res = res or config.COLLISION_RASTER_RES
+    nx, ny, n_theta = env.nx, env.ny, env.n_theta
+    x0, x1, y0, y1 = region or (0, nx, 0, ny)
+    collision_map = np.zeros((x1 - x0, y1 - y0, n_theta), dtype=bool)
+    cx = np.arange(x0, x1)[:, None]
+    cy = np.arange(y0, y1)[None, :]
+
+    footprints, kernels, pad = kernels or footprint_kernels(env, res)
+
+    # Obstacle raster of the region with a pad large enough for every kernel offset,
+    # stored as prefix sums along y so that a contiguous run of rows is a single subtraction.
+    window = (x0 * res - pad, x1 * res + pad, y0 * res - pad, y1 * res + pad)
+    grid = np.zeros((window[1] - window[0], window[3] - window[2]), dtype=bool)
+    for obstacle in env.obstacles:
+        i, j = _cover_cells(obstacle, res, window=window)
+        grid[i - window[0], j - window[2]] = True
+    prefix = np.zeros((grid.shape[0], grid.shape[1] + 1), dtype=np.int32)
+    np.cumsum(grid, axis=1, out=prefix[:, 1:])
+
+    for theta_idx, (footprint, runs) in enumerate(zip(footprints, kernels)):
+        corners = np.asarray(footprint.exterior.coords)[:-1]
+        # Footprint fully inside [0, nx] x [0, ny] (touching the border is allowed)
+        outside = ((cx + corners[:, 0].min() < 0) | (cx + corners[:, 0].max() > nx) |
+                   (cy + corners[:, 1].min() < 0) | (cy + corners[:, 1].max() > ny))
+
+        hits = np.zeros((x1 - x0, y1 - y0), dtype=np.int32)
+        for col, lo, hi in runs:
+            rows = prefix[pad + col: pad + col + (x1 - x0) * res: res]
+            hits += rows[:, pad + hi + 1: pad + hi + 1 + (y1 - y0) * res: res]
+            hits -= rows[:, pad + lo: pad + lo + (y1 - y0) * res: res]
+        collision_map[:, :, theta_idx] = outside | (hits > 0)
+
+    return collision_map
+
+
+class ExactCollisionChecker:
+    """
+    Evaluates `Environment.is_collision` on whole blocks of grid states with the
+    same Shapely predicates, giving bit-identical results.
+
+    Obstacles are indexed by an STRtree and the world boundary is prepared. A cell
+    whose center is farther than the footprint circumradius from every obstacle
+    (resp. from every world edge) cannot intersect one (resp. leave the world), so
+    its polygon test is skipped. The remaining footprints are built by translating
+    the rotated base footprint, which matches `_get_robot_footprint` coordinate for
+    coordinate, and tested in bulk.
+    """
+
+    def __init__(self, env, region=None):
+        self.env = env
+        self.nx, self.ny = env.nx, env.ny
+        x0, x1, y0, y1 = region or (0, env.nx, 0, env.ny)
+        self.block_shape = (x1 - x0, y1 - y0)
+        self.tree = shapely.STRtree(env.obstacles)
+        self.boundary = shapely.Polygon(env.world_boundary.exterior.coords)
+        shapely.prepare(self.boundary)
+        l, w = config.ROBOT_LENGTH, config.ROBOT_WIDTH
+        # Small margin so rounding in the rotated corners can never matter
+        self.radius = np.hypot(l / 2, w / 2) + 1e-6
+
+        x, y = np.meshgrid(np.arange(x0, x1), np.arange(y0, y1), indexing='ij')
+        self.x, self.y = x.ravel(), y.ravel()
+        centers = shapely.points(self.x, self.y)
+        obstacle_dist = np.full(len(self.x), np.inf)
+        for obstacle in env.obstacles:
+            obstacle_dist = np.minimum(obstacle_dist, shapely.distance(centers, obstacle))
+        edge_dist = np.minimum.reduce([self.x, self.nx - self.x, self.y, self.ny - self.y])
+        self.near_obstacle = obstacle_dist <= self.radius
+        self.near_edge = edge_dist <= self.radius
+
+    def collision_block(self, theta_indices):
+        block = np.zeros(self.block_shape + (len(theta_indices),), dtype=bool)
+        check = self.near_obstacle | self.near_edge
+        x, y = self.x[check], self.y[check]
+        near_edge = self.near_edge[check]
+        near_obstacle = self.near_obstacle[check]
+        for k, theta_idx in enumerate(theta_indices):
+            base = np.asarray(self.env._get_robot_footprint((0, 0, theta_idx)).exterior.coords)
+            coords = base[None, :, :] + np.stack([x, y], axis=1)[:, None, :].astype(float)
+            robots = shapely.polygons(coords)
+
+            hit = np.zeros(len(x), dtype=bool)
+            hit[near_edge] = ~shapely.contains(self.boundary, robots[near_edge])
+            test = near_obstacle & ~hit
+            robot_idx, _ = self.tree.query(robots[test], predicate='intersects')
+            hit[np.flatnonzero(test)[np.unique(robot_idx)]] = True
+
+            plane = np.zeros(len(self.x), dtype=bool)
+            plane[check] = hit
+            block[:, :, k] = plane.reshape(self.block_shape)
+        return block
+
+
+class BatchCollisionChecker:
+    """
+    `Environment.is_collision` for arrays of continuous (x, y, theta_idx) states.
+
+    Uses the same Shapely predicates on footprints built exactly like
+    `_get_robot_footprint`, so results are identical. A precomputed clearance
+    grid (distance from every lattice point to the nearest obstacle) bounds the
+    obstacle distance of any center, which lets most states in open space skip
+    the polygon tests entirely.
+    """
+
+    def __init__(self, env):
+        self.nx, self.ny = env.nx, env.ny
+        self.offsets = np.stack([np.asarray(env._get_robot_footprint((0, 0, t)).exterior.coords)
+                                 for t in range(env.n_theta)])
+        self.tree = shapely.STRtree(env.obstacles)
+        self.boundary = shapely.Polygon(env.world_boundary.exterior.coords)
+        shapely.prepare(self.boundary)
+        self.radius = np.hypot(config.ROBOT_LENGTH / 2, config.ROBOT_WIDTH / 2) + 1e-6
+
+        gx, gy = np.meshgrid(np.arange(self.nx + 1), np.arange(self.ny + 1), indexing='ij')
+        lattice = shapely.points(gx.ravel(), gy.ravel())
+        clearance = np.full(lattice.shape, np.inf)
+        for obstacle in env.obstacles:
+            clearance = np.minimum(clearance, shapely.distance(lattice, obstacle))
+        # Any center lies within sqrt(2)/2 of its nearest lattice point
+        self.clearance = clearance.reshape(gx.shape) - np.sqrt(0.5)
+
+    def __call__(self, x, y, theta):
+        x, y, theta = np.asarray(x, dtype=float), np.asarray(y, dtype=float), np.asarray(theta)
+        hit = (x < 0) | (x >= self.nx) | (y < 0) | (y >= self.ny)
+        ix = np.clip(np.round(x), 0, self.nx).astype(int)
+        iy = np.clip(np.round(y), 0, self.ny).astype(int)
+        near_obstacle = ~hit & (self.clearance[ix, iy] <= self.radius)
+        near_edge = ~hit & (np.minimum.reduce([x, self.nx - x, y, self.ny - y]) <= self.radius)
+
+        check = np.flatnonzero(near_obstacle | near_edge)
+        if len(check) == 0:
+            return hit
+        coords = self.offsets[theta[check]] + np.stack([x[check], y[check]], axis=1)[:, None, :]
+        robots = shapely.polygons(coords)
+
+        edge = near_edge[check]
+        outside = np.zeros(len(check), dtype=bool)
+        outside[edge] = ~shapely.contains(self.boundary, robots[edge])
+        test = near_obstacle[check] & ~outside
+        robot_idx, _ = self.tree.query(robots[test], predicate='intersects')
+        outside[np.flatnonzero(test)[np.unique(robot_idx)]] = True
+        hit[check] = outside
+        return hit
+
+
+class SATCollisionChecker:
+    """
+    `Environment.is_collision` for arrays of (x, y, theta_idx) states without
+    building any Shapely geometry.
+
+    Footprint corners are the same rotated base coordinates plus (x, y) as in
+    `_get_robot_footprint`, so the world boundary test is an exact comparison of
+    their per-heading extent against [0, nx] x [0, ny]. Obstacles (which must be
+    convex) are tested with the separating axis theorem on their edge normals and
+    the robot's two axes; the robot's projection on a unit axis u is its center's
+    projection plus or minus l/2 |u.d| + w/2 |u.n|. Candidate obstacles come from
+    a uniform grid of `cell`-sized bins, each holding the obstacles whose bounding
+    box grown by the footprint circumradius overlaps it.
+
+    Shapely treats touching shapes as intersecting. When the largest separation
+    found is within `eps` of zero, rounding could decide the state either way, so
+    it is passed to Shapely instead; results are identical to `is_collision`.
+    """
+
+    @staticmethod
+    def supports(env):
+        return all(obstacle.equals(obstacle.convex_hull) for obstacle in env.obstacles)
+
+    def __init__(self, env, cell=4.0, eps=1e-9):
+        self.nx, self.ny = env.nx, env.ny
+        self.cell, self.eps = cell, eps
+        offsets = np.stack([np.asarray(env._get_robot_footprint((0, 0, t)).exterior.coords)[:-1]
+                            for t in range(env.n_theta)])
+        self.offsets = offsets
+        self.extent = np.stack([offsets[:, :, 0].min(axis=1), offsets[:, :, 0].max(axis=1),
+                                offsets[:, :, 1].min(axis=1), offsets[:, :, 1].max(axis=1)], axis=1)
+        theta = np.arange(env.n_theta) * config.DELTA_THETA_RAD
+        self.d = np.stack([np.cos(theta), np.sin(theta)], axis=1)
+        self.n = np.stack([-np.sin(theta), np.cos(theta)], axis=1)
+        self.half_l, self.half_w = config.ROBOT_LENGTH / 2, config.ROBOT_WIDTH / 2
+        self.radius = np.hypot(self.half_l, self.half_w) + 1e-6
+        self.tree = shapely.STRtree(env.obstacles) if env.obstacles else None
+
+        # Obstacle vertices and unit edge normals, padded by repeating the last one,
+        # with each polygon's (fixed) projection interval on its own normals as
+        # center +- half width
+        n_vertices = max((len(o.exterior.coords) - 1 for o in env.obstacles), default=1)
+        self.vertices = np.zeros((len(env.obstacles), n_vertices, 2))
+        self.axes = np.zeros((len(env.obstacles), n_vertices, 2))
+        self.axis_mid = np.zeros((len(env.obstacles), n_vertices))
+        self.axis_half = np.zeros((len(env.obstacles), n_vertices))
+        bins = {}
+        self.grid_shape = (int(np.ceil(self.nx / cell)), int(np.ceil(self.ny / cell)))
+        for k, obstacle in enumerate(env.obstacles):
+            if not obstacle.equals(obstacle.convex_hull):
+                raise ValueError("The SAT collision backend needs convex obstacles")
+            v = np.asarray(obstacle.exterior.coords)[:-1]
+            e = np.roll(v, -1, axis=0) - v
+            pad = n_vertices - len(v)
+            v = np.concatenate([v, np.repeat(v[-1:], pad, axis=0)])
+            e = np.concatenate([e, np.repeat(e[-1:], pad, axis=0)])
+            normals = np.stack([-e[:, 1], e[:, 0]], axis=1)
+            normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+            proj = v @ normals.T
+            self.vertices[k], self.axes[k] = v, normals
+            self.axis_mid[k] = (proj.max(axis=0) + proj.min(axis=0)) / 2
+            self.axis_half[k] = (proj.max(axis=0) - proj.min(axis=0)) / 2
+
+            minx, miny, maxx, maxy = obstacle.bounds
+            bx = np.arange(int(np.floor((minx - self.radius) / cell)), int(np.floor((maxx + self.radius) / cell)) + 1)
+            by = np.arange(int(np.floor((miny - self.radius) / cell)), int(np.floor((maxy + self.radius) / cell)) + 1)
+            bx = bx[(bx >= 0) & (bx < self.grid_shape[0])]
+            by = by[(by >= 0) & (by < self.grid_shape[1])]
+            for b in np.ravel_multi_index(np.meshgrid(bx, by, indexing='ij'), self.grid_shape).ravel():
+                bins.setdefault(b, []).append(k)
+        # Bins as CSR: obstacles of bin b are bin_obstacles[bin_start[b]:bin_start[b + 1]]
+        counts = np.zeros(int(np.prod(self.grid_shape)), dtype=np.int64)
+        for b, members in bins.items():
+            counts[b] = len(members)
+        self.bin_start = np.concatenate([[0], np.cumsum(counts)])
+        self.bin_obstacles = np.zeros(self.bin_start[-1], dtype=np.int64)
+        for b, members in bins.items():
+            self.bin_obstacles[self.bin_start[b]:self.bin_start[b + 1]] = members
+
+        # Plain Python copies for the single-state path
+        self._extent = self.extent.tolist()
+        self._frame = np.concatenate([self.d, self.n], axis=1).tolist()
+        self._bins = [self.bin_obstacles[lo:hi].tolist() for lo, hi in zip(self.bin_start[:-1], self.bin_start[1:])]
+        self._obstacle_axes = np.concatenate([self.axes, self.axis_mid[..., None], self.axis_half[..., None]],
+                                             axis=2).tolist()
+        self._obstacle_vertices = self.vertices.tolist()
+
+    def _pairs(self, x, y):
+        # Broadphase: (state, obstacle) pairs from the bin of each center
+        bx = np.minimum((x // self.cell).astype(np.int64), self.grid_shape[0] - 1)
+        by = np.minimum((y // self.cell).astype(np.int64), self.grid_shape[1] - 1)
+        b = bx * self.grid_shape[1] + by
+        counts = self.bin_start[b + 1] - self.bin_start[b]
+        state = np.repeat(np.arange(len(x)), counts)
+        first = np.repeat(self.bin_start[b] - np.cumsum(counts) + counts, counts)
+        return state, self.bin_obstacles[first + np.arange(len(state))]
+
+    def _separation(self, x, y, theta, obstacle):
+        # Largest gap between the robot's and the obstacle's projections over all
+        # candidate axes; negative means overlap
+        d, n = self.d[theta], self.n[theta]
+        gap = np.full(len(x), -np.inf)
+        for v in range(self.axes.shape[1]):
+            u = self.axes[obstacle, v]
+            center = x * u[:, 0] + y * u[:, 1]
+            r = (self.half_l * np.abs(u[:, 0] * d[:, 0] + u[:, 1] * d[:, 1]) +
+                 self.half_w * np.abs(u[:, 0] * n[:, 0] + u[:, 1] * n[:, 1]))
+            gap = np.maximum(gap, np.abs(center - self.axis_mid[obstacle, v]) - self.axis_half[obstacle, v] - r)
+        for axis, half in ((d, self.half_l), (n, self.half_w)):
+            center = x * axis[:, 0] + y * axis[:, 1]
+            lo, hi = np.inf, -np.inf
+            for v in range(self.vertices.shape[1]):
+                p = self.vertices[obstacle, v]
+                proj = p[:, 0] * axis[:, 0] + p[:, 1] * axis[:, 1]
+                lo, hi = np.minimum(lo, proj), np.maximum(hi, proj)
+            gap = np.maximum(gap, np.maximum(lo - center - half, center - half - hi))
+        return gap
+
+    def collides(self, x, y, theta):
+        # Single-state version of __call__ on plain floats: NumPy's per-call
+        # overhead on one-element arrays is larger than the test itself
+        if x < 0 or x >= self.nx or y < 0 or y >= self.ny:
+            return True
+        x0, x1, y0, y1 = self._extent[theta]
+        if x + x0 < 0 or x + x1 > self.nx or y + y0 < 0 or y + y1 > self.ny:
+            return True
+        b = min(int(x // self.cell), self.grid_shape[0] - 1) * self.grid_shape[1] + \
+            min(int(y // self.cell), self.grid_shape[1] - 1)
+        dx, dy, nx, ny = self._frame[theta]
+        touching = False
+        for k in self._bins[b]:
+            axes, vertices = self._obstacle_axes[k], self._obstacle_vertices[k]
+            gap = -np.inf
+            for ux, uy, mid, half in axes:
+                r = self.half_l * abs(ux * dx + uy * dy) + self.half_w * abs(ux * nx + uy * ny)
+                gap = max(gap, abs(x * ux + y * uy - mid) - half - r)
+            for ax, ay, half in ((dx, dy, self.half_l), (nx, ny, self.half_w)):
+                center = x * ax + y * ay
+                proj = [px * ax + py * ay for px, py in vertices]
+                gap = max(gap, min(proj) - center - half, center - half - max(proj))
+            if gap < -self.eps:
+                return True
+            touching |= gap <= self.eps
+        if touching:
+            robot = shapely.polygons(self.offsets[theta] + (x, y))
+            return len(self.tree.query(robot, predicate='intersects')) > 0
+        return False
+
+    def __call__(self, x, y, theta):
+        x, y, theta = np.asarray(x, dtype=float), np.asarray(y, dtype=float), np.asarray(theta)
+        hit = (x < 0) | (x >= self.nx) | (y < 0) | (y >= self.ny)
+        inside = np.flatnonzero(~hit)
+        extent = self.extent[theta[inside]]
+        xi, yi = x[inside], y[inside]
+        hit[inside] = ((xi + extent[:, 0] < 0) | (xi + extent[:, 1] > self.nx) |
+                       (yi + extent[:, 2] < 0) | (yi + extent[:, 3] > self.ny))
+
+        inside = inside[~hit[inside]]
+        state, obstacle = self._pairs(x[inside], y[inside])
+        if len(state) == 0:
+            return hit
+        pair = inside[state]
+        gap = self._separation(x[pair], y[pair], theta[pair], obstacle)
+
+        overlap = np.zeros(len(inside), dtype=bool)
+        overlap[state[gap < -self.eps]] = True
+        touching = np.unique(state[np.abs(gap) <= self.eps])
+        touching = touching[~overlap[touching]]
+        if len(touching):
+            states = inside[touching]
+            coords = self.offsets[theta[states]] + np.stack([x[states], y[states]], axis=1)[:, None, :]
+            robot_idx, _ = self.tree.query(shapely.polygons(coords), predicate='intersects')
+            overlap[touching[np.unique(robot_idx)]] = True
+        hit[inside] = overlap
+        return hit
+
+
+def compare_collision_backends(env, n=100000, seed=0, checker=None):
+    """
+    Cross-checks a batch collision backend (default: SATCollisionChecker) against
+    the Shapely `Environment.is_collision_shapely` on `n` random continuous states,
+    half of them with an integer center, where touching contacts are common.
+    Returns the number of disagreeing states.
+    """
+    checker = checker or SATCollisionChecker(env)
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(-2, env.nx + 2, n)
+    y = rng.uniform(-2, env.ny + 2, n)
+    x[:n // 2], y[:n // 2] = np.round(x[:n // 2]), np.round(y[:n // 2])
+    theta = rng.integers(0, env.n_theta, n)
+    reference = np.array([env.is_collision_shapely((x[i], y[i], theta[i])) for i in range(n)])
+    mismatches = int(np.count_nonzero(checker(x, y, theta) != reference))
+    print(f"Collision backend check: {n} states, {int(reference.sum())} collisions, {mismatches} mismatches")
+    return mismatches
+
+
+_worker_checker = None
+
+
+def _init_worker(env, region=None):
+    global _worker_checker
+    _worker_checker = ExactCollisionChecker(env, region)
+
+
+def _collision_shard(theta_indices):
+    return theta_indices, _worker_checker.collision_block(theta_indices)
+
+
+def build_collision_map_exact(env, workers=None, region=None):
+    """
+    Exact collision map, sharded by heading. With `workers` > 1 the shards run in
+    a process pool and are assembled into one boolean array; the result does not
+    depend on the number of workers. `region` works as in
+    `build_collision_map_raster`.
+    """
+    workers = workers or config.COLLISION_MAP_WORKERS or os.cpu_count()
+    x0, x1, y0, y1 = region or (0, env.nx, 0, env.ny)
+    collision_map = np.zeros((x1 - x0, y1 - y0, env.n_theta), dtype=bool)
+    n_shards = min(env.n_theta, 4 * workers)
+    shards = [list(s) for s in np.array_split(np.arange(env.n_theta), n_shards)]
+
+    def assemble(results):
+        done = 0
+        for theta_indices, block in results:
+            collision_map[:, :, theta_indices] = block
+            done += len(theta_indices)
+            print(f"Processing... {done}/{env.n_theta} headings")
+
+    if workers == 1:
+        _init_worker(env, region)
+        assemble(map(_collision_shard, shards))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(env, region)) as pool:
+            futures = [pool.submit(_collision_shard, shard) for shard in shards]
+            assemble(future.result() for future in as_completed(futures))
+    return collision_map
+
+
+def compare_collision_maps(approx_map, exact_map):
+    """
+    Reports how a conservative collision map differs from the exact one.
+    Returns (extra, missed): states only the approximation marks as colliding, and
+    states it wrongly marks as free (always 0 for a conservative map).
+    """
+    extra = int(np.count_nonzero(approx_map & ~exact_map))
+    missed = int(np.count_nonzero(exact_map & ~approx_map))
+    total = int(np.count_nonzero(exact_map))
+    print(f"Collision map check: {total} exact collisions, "
+          f"{extra} conservative extra ({100.0 * extra / approx_map.size:.3f}% of states), "
+          f"{missed} missed")
+    return extra, missed
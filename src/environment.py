@@ -2,9 +2,10 @@ import numpy as np
 from shapely.geometry import Polygon
 from shapely.affinity import translate, rotate
 from src import config
+from src.cspace import BatchCollisionChecker, SATCollisionChecker
 
 class Environment:
-    def __init__(self):
+    def __init__(self, collision_backend=None):
         self.config = config
         self.nx = config.NX
         self.ny = config.NY
@@ -20,6 +21,39 @@ class Environment:
 
         self.world_boundary = Polygon([(0, 0), (self.nx, 0), (self.nx, self.ny), (0, self.ny)])
 
+        # 'sat' (NumPy separating axis tests) or 'shapely'; both give identical results
+        self.collision_backend = collision_backend or config.COLLISION_BACKEND
+        if self.collision_backend not in ('sat', 'shapely'):
+            raise ValueError(f"Unknown collision backend: {self.collision_backend}")
+        # Vectorized collision checker, built on first use and reset when obstacles change
+        self._batch_checker = None
+
+    def __getstate__(self):
+        # Modules can't be pickled: drop the config reference when the environment
+        # is shipped to worker processes and restore it on the other side.
+        state = self.__dict__.copy()
+        del state['config']
+        state['_batch_checker'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.config = config
+
+    def add_obstacle(self, vertices):
+        obstacle = Polygon(vertices)
+        self.obstacles.append(obstacle)
+        self._batch_checker = None
+        return obstacle
+
+    def remove_obstacle(self, vertices):
+        target = Polygon(vertices)
+        for i, obstacle in enumerate(self.obstacles):
+            if obstacle.equals(target):
+                self._batch_checker = None
+                return self.obstacles.pop(i)
+        raise ValueError(f"No obstacle with vertices {vertices}")
+
     def _get_robot_footprint(self, state):
         x, y, theta_idx = state
         theta_rad = theta_idx * config.DELTA_THETA_RAD
@@ -28,7 +62,34 @@ class Environment:
         rotated = rotate(self.base_robot_footprint, theta_rad, origin='center', use_radians=True)
         return translate(rotated, x, y)
 
+    def footprint_corners(self, states):
+        """
+        Footprint vertices of many (x, y, theta_idx) states at once, shape (N, 4, 2),
+        in the same order as `_get_robot_footprint(state).exterior.coords`.
+        """
+        states = np.asarray(states, dtype=float).reshape(-1, 3)
+        base = np.asarray(self.base_robot_footprint.exterior.coords)[:-1]
+        theta = states[:, 2] * config.DELTA_THETA_RAD
+        cos_t, sin_t = np.cos(theta)[:, None], np.sin(theta)[:, None]
+        # The base footprint is centered on the origin, its rotation center
+        x = states[:, :1] + cos_t * base[:, 0] - sin_t * base[:, 1]
+        y = states[:, 1:2] + sin_t * base[:, 0] + cos_t * base[:, 1]
+        return np.stack([x, y], axis=2)
+
+    def _checker(self):
+        if self._batch_checker is None:
+            # The SAT backend needs convex obstacles, with a concave one Shapely is used
+            sat = self.collision_backend == 'sat' and SATCollisionChecker.supports(self)
+            self._batch_checker = (SATCollisionChecker if sat else BatchCollisionChecker)(self)
+        return self._batch_checker
+
     def is_collision(self, state):
+        checker = self._checker() if self.collision_backend == 'sat' else None
+        if isinstance(checker, SATCollisionChecker):
+            return checker.collides(*state)
+        return self.is_collision_shapely(state)
+
+    def is_collision_shapely(self, state):
         x, y, _ = state
         # Quick pre-check: if center is out, definitely a collision 
         # avoid expensive polygon checks
@@ -46,6 +107,14 @@ class Environment:
 
         return False
 
+    def is_collision_batch(self, x, y, theta):
+        # Same result as is_collision for every (x[i], y[i], theta[i])
+        return self._checker()(x, y, theta)
+
+    def is_goal_batch(self, x, y, theta):
+        gx, gy, gtheta = self.goal_state
+        return (np.round(x) == gx) & (np.round(y) == gy) & (np.asarray(theta) == gtheta)
+
     def is_goal(self, state):
         x, y, theta = state
         gx, gy, gtheta = self.goal_state
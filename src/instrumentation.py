@@ -0,0 +1,126 @@
+import contextlib
+import functools
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_memory():
+    # Peak resident set size of this process in bytes (None where unavailable)
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def resident_memory():
+    # Current resident set size of this process in bytes (None where unavailable)
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Instrumentation:
+    """
+    Structured telemetry for the solvers, the simulation and the rendering.
+
+    `phase(name)` times a block (`timed(name)` a function) and accumulates it
+    per phase name; `sweep` records one Bellman sweep (max delta, states updated
+    per second). Every event is also passed as a dict to each hook, e.g. a
+    JsonLinesHook streaming them to a file. `recorder` below is the
+    process-wide instance the planner, the simulation and the visualizer
+    report to.
+    """
+
+    def __init__(self, hooks=()):
+        self.hooks = list(hooks)
+        self.reset()
+
+    def reset(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.delta_history = []
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+        return hook
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def emit(self, event, **data):
+        if not self.hooks:
+            return
+        record = {'event': event, 'time': time.perf_counter() - self.start}
+        record.update(data)
+        record['peak_memory'] = peak_memory()
+        for hook in self.hooks:
+            hook(record)
+
+    @contextlib.contextmanager
+    def phase(self, name, **data):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            total = self.phases.setdefault(name, {'seconds': 0.0, 'calls': 0})
+            total['seconds'] += seconds
+            total['calls'] += 1
+            self.emit('phase', phase=name, seconds=seconds, **data)
+
+    def timed(self, name):
+        # Decorator: every call of the function is timed as phase `name`
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.phase(name, function=fn.__name__):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def sweep(self, solver, iteration, delta, states, seconds):
+        self.delta_history.append(float(delta))
+        self.emit('sweep', solver=solver, iteration=iteration, delta=float(delta), states=int(states),
+                  seconds=seconds, states_per_second=states / seconds if seconds > 0 else None)
+
+    def summary(self):
+        return {'phases': {name: dict(total) for name, total in self.phases.items()},
+                'sweeps': len(self.delta_history), 'delta_history': list(self.delta_history),
+                'peak_memory': peak_memory(), 'time': time.perf_counter() - self.start}
+
+    def report(self):
+        summary = self.summary()
+        print("\nInstrumentation summary:")
+        for name, total in summary['phases'].items():
+            print(f"  {name:<20} {total['seconds']:>9.3f}s ({total['calls']} calls)")
+        if summary['peak_memory'] is not None:
+            print(f"  peak memory          {summary['peak_memory'] / 2 ** 20:>9.1f} MB")
+        self.emit('summary', **summary)
+
+
+class JsonLinesHook:
+    """Writes every event as one JSON object per line to `path` (appending)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'a')
+
+    def __call__(self, record):
+        self.file.write(json.dumps(record, default=float) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+recorder = Instrumentation()
@@ -0,0 +1,127 @@
+import time
+import numpy as np
+from src import config
+from src.tables import dense
+
+
+class GoalPolicies:
+    """
+    Solved V and policy for several goal states, indexed by goal. Arrays have
+    shape (K, NX, NY, N_THETA) in the planner's dtypes; `index` maps a goal
+    state to its position.
+    """
+
+    def __init__(self, goal_states, V, policy):
+        self.goal_states = [tuple(int(v) for v in g) for g in goal_states]
+        self.V, self.policy = V, policy
+
+    def index(self, goal_state):
+        goal_state = tuple(int(v) for v in goal_state)
+        if goal_state not in self.goal_states:
+            raise ValueError(f"No solved policy for goal {goal_state}")
+        return self.goal_states.index(goal_state)
+
+    def __len__(self):
+        return len(self.goal_states)
+
+
+def solve_goals(planner, goal_states):
+    """
+    Synchronous value iteration for K goal states in one batched computation.
+
+    The sweeps run over the collision-free states only, renumbered 0..M-1, with
+    V stored as an (M + 1, K) array: every Bellman backup gathers the K values of
+    a successor in one row, and the goal-independent tables (successors and
+    rewards of every move) are shared by all goals. Terminal moves (collisions,
+    leaving the grid) point at row M, which holds zeros, so their backup is just
+    the reward; moves into a goal are terminal for that goal's column only and are
+    patched to R_GOAL. A goal's column is dropped as soon as its own max delta is
+    below VI_CONVERGENCE_THRESHOLD, so each goal gets the same sweeps and the same
+    V/policy as a single-goal `run_value_iteration`.
+    """
+    start_time = time.time()
+    goal_states = [tuple(int(v) for v in g) for g in goal_states]
+    shape = (planner.nx, planner.ny, planner.n_theta)
+    K = len(goal_states)
+    gamma = config.GAMMA
+    planner.build_transition_tables()
+    next_idx = planner.transitions.next_idx
+    collision_flat = dense(planner.collision_map).reshape(-1)
+
+    goals = np.ravel_multi_index(np.array(goal_states).T, shape)
+    if len(np.unique(goals)) != K:
+        raise ValueError("Goal states must be distinct")
+    if collision_flat[goals].any():
+        raise ValueError("Goal states must be collision-free")
+
+    # Compact numbering of the free states, row M is the terminal sentinel
+    free = np.flatnonzero(~collision_flat)
+    M = len(free)
+    row = np.full(len(collision_flat), M)
+    row[free] = np.arange(M)
+    reward, hit = planner.transitions.rewards(collision_flat, np.zeros_like(collision_flat), states=free)
+    successor = np.where(hit, M, row[next_idx[:, free]])
+    goal_rows = row[goals]
+    goal_col = np.full(M + 1, -1)
+    goal_col[goal_rows] = np.arange(K)
+    into_goal = []
+    for a in range(planner.n_actions):
+        src = np.flatnonzero(goal_col[successor[a]] >= 0)
+        into_goal.append((src, goal_col[successor[a, src]]))
+
+    def backup(W, cols, a):
+        q = np.take(W, successor[a], axis=0)
+        q *= gamma
+        q += reward[a][:, None]
+        # Moves into a goal are terminal for that goal's column only
+        position = np.full(K, -1)
+        position[cols] = np.arange(len(cols))
+        src, col = into_goal[a]
+        keep = position[col] >= 0
+        q[src[keep], position[col[keep]]] = config.R_GOAL
+        return q
+
+    def best_action(W, cols):
+        best, action = backup(W, cols, 0), np.zeros((M, len(cols)), dtype=np.int64)
+        for a in range(1, planner.n_actions):
+            q = backup(W, cols, a)
+            action[q > best] = a
+            np.maximum(best, q, out=best)
+        best[goal_rows[cols], np.arange(len(cols))] = config.R_GOAL
+        return best, action
+
+    V = np.zeros((M + 1, K), dtype=planner.value_dtype)
+    V[goal_rows, np.arange(K)] = config.R_GOAL
+    live = np.arange(K)
+    W = V.copy()
+    iterations = np.zeros(K, dtype=np.int64)
+    sweep = 0
+    with planner.instrumentation.phase('sweeps', solver='multi_goal', goals=K):
+        while len(live):
+            sweep += 1
+            sweep_start = time.perf_counter()
+            best = backup(W, live, 0)
+            for a in range(1, planner.n_actions):
+                np.maximum(best, backup(W, live, a), out=best)
+            best[goal_rows[live], np.arange(len(live))] = config.R_GOAL
+            delta = np.abs(best - W[:M]).max(axis=0)
+            W[:M] = best
+            iterations[live] = sweep
+            # States counts every (state, goal) pair backed up in this sweep
+            planner.instrumentation.sweep('multi_goal', sweep, delta.max(), M * len(live),
+                                          time.perf_counter() - sweep_start)
+            print(f"Sweep {sweep}: {len(live)} goals left, max delta = {delta.max():.6f}")
+            done = delta < config.VI_CONVERGENCE_THRESHOLD
+            if done.any():
+                V[:, live[done]] = W[:, done]
+                live, W = live[~done], np.ascontiguousarray(W[:, ~done])
+
+    _, action = best_action(V, np.arange(K))
+    action[goal_rows, np.arange(K)] = -1
+    full_V = np.full((K, len(collision_flat)), config.R_COLLISION, dtype=planner.value_dtype)
+    full_V[:, free] = V[:M].T
+    policy = np.full((K, len(collision_flat)), -1, dtype=planner.policy_dtype)
+    policy[:, free] = action.T
+    elapsed = time.time() - start_time
+    return GoalPolicies(goal_states, full_V.reshape((K,) + shape), policy.reshape((K,) + shape)), {
+        'method': 'multi_goal', 'goals': K, 'iterations': iterations.tolist(), 'sweeps': sweep, 'time': elapsed}
@@ -0,0 +1,154 @@
+import time
+import types
+import numpy as np
+from src import config
+from src.tables import dense
+from src.transitions import TransitionModel, q_values, sweep_states
+
+
+class CoarseProblem:
+    """
+    Coarsened copy of a planner's MDP: `factor` fine cells per coarse cell along
+    x/y and `theta_factor` fine headings per coarse heading.
+
+    A coarse state is blocked when the fine state at its lower-left corner is; a
+    coarse move covers `factor` fine cells, so step/rotation rewards are scaled
+    and GAMMA is raised to the same power to keep values comparable to the fine V.
+    """
+
+    def __init__(self, planner, factor, theta_factor):
+        self.factor, self.theta_factor = factor, theta_factor
+        self.shape = (planner.nx // factor, planner.ny // factor, planner.n_theta // theta_factor)
+        nx, ny, n_theta = self.shape
+
+        fine_collision = dense(planner.collision_map)
+        collision = np.array(fine_collision[:nx * factor:factor, :ny * factor:factor,
+                                            :n_theta * theta_factor:theta_factor])
+        goal = np.zeros(self.shape, dtype=bool)
+        for gx, gy, gtheta in np.argwhere(dense(planner.goal_map)):
+            coarse_goal = (min(gx // factor, nx - 1), min(gy // factor, ny - 1),
+                           min(gtheta // theta_factor, n_theta - 1))
+            goal[coarse_goal] = True
+            collision[coarse_goal] = False
+
+        self.gamma = config.GAMMA ** factor
+        params = types.SimpleNamespace(
+            R_GOAL=config.R_GOAL, R_COLLISION=config.R_COLLISION,
+            R_STEP=config.R_STEP * factor, R_ROTATE=config.R_ROTATE * theta_factor,
+            R_DRIFT_PENALTY=config.R_DRIFT_PENALTY)
+        self.transitions = TransitionModel(nx, ny, n_theta, step_size=1.0,
+                                           delta_theta_rad=config.DELTA_THETA_RAD * theta_factor)
+        self.reward, self.terminal = self.transitions.rewards(collision, goal, params)
+
+        collision_flat, goal_flat = collision.reshape(-1), goal.reshape(-1)
+        self.active = ~(collision_flat | goal_flat)
+        self.V = np.where(collision_flat, config.R_COLLISION, np.where(goal_flat, config.R_GOAL, 0.0))
+
+    def solve(self, solver=None):
+        sweeps = sweep_states(self.V, np.flatnonzero(self.active), self.transitions.next_idx,
+                              self.reward, self.terminal, self.gamma, config.VI_CONVERGENCE_THRESHOLD, solver)
+        q = q_values(self.V, self.reward, self.terminal, self.transitions.next_idx, self.gamma)
+        self.policy = np.where(self.active, np.argmax(q, axis=0), -1)
+        return sweeps
+
+    def to_coarse(self, state):
+        x, y, theta = state
+        nx, ny, n_theta = self.shape
+        return (min(int(x) // self.factor, nx - 1), min(int(y) // self.factor, ny - 1),
+                min(int(theta) // self.theta_factor, n_theta - 1))
+
+    def trace(self, start_state):
+        # (x, y) coarse cells visited by the coarse policy from a fine start state
+        s = np.ravel_multi_index(self.to_coarse(start_state), self.shape)
+        visited = [s]
+        for _ in range(self.shape[0] * self.shape[1]):
+            action = self.policy[s]
+            if action < 0 or self.terminal[action, s]:
+                break
+            s = self.transitions.next_idx[action, s]
+            visited.append(s)
+        x, y, _ = np.unravel_index(np.array(visited), self.shape)
+        return x, y
+
+    def upsample(self, fine_shape):
+        nx, ny, n_theta = self.shape
+        x = np.minimum(np.arange(fine_shape[0]) // self.factor, nx - 1)
+        y = np.minimum(np.arange(fine_shape[1]) // self.factor, ny - 1)
+        theta = np.minimum(np.arange(fine_shape[2]) // self.theta_factor, n_theta - 1)
+        return self.V.reshape(self.shape)[np.ix_(x, y, theta)]
+
+
+def corridor_mask(coarse, start_states, radius, fine_shape):
+    # Fine (x, y) cells within `radius` coarse cells of any coarse optimal path
+    nx, ny, _ = coarse.shape
+    visited = np.zeros((nx, ny), dtype=bool)
+    for start in start_states:
+        x, y = coarse.trace(start)
+        visited[x, y] = True
+    padded = np.pad(visited, radius)
+    corridor = np.zeros_like(visited)
+    for dx in range(2 * radius + 1):
+        for dy in range(2 * radius + 1):
+            corridor |= padded[dx:dx + nx, dy:dy + ny]
+    x = np.minimum(np.arange(fine_shape[0]) // coarse.factor, nx - 1)
+    y = np.minimum(np.arange(fine_shape[1]) // coarse.factor, ny - 1)
+    return corridor[np.ix_(x, y)]
+
+
+def solve_multi_resolution(planner, start_states=None, factor=None, theta_factor=None, radius=None):
+    """
+    Coarse-to-fine solve for `planner`.
+
+    The coarse problem is solved first; its V, upsampled, warm-starts the fine V.
+    When `start_states` are given, the fine sweeps are restricted to a corridor
+    around the coarse optimal paths from those states (states outside keep the
+    upsampled values), and the full domain is only swept if the resulting fine
+    policy fails to reach the goal from one of them. Without start states the
+    whole fine domain is swept from the warm start. `corridor` in the returned
+    stats describes the corridor when only it was swept, None otherwise.
+    """
+    factor = factor or config.MULTIRES_FACTOR
+    theta_factor = theta_factor or config.MULTIRES_THETA_FACTOR
+    radius = config.MULTIRES_CORRIDOR_RADIUS if radius is None else radius
+    fine_shape = (planner.nx, planner.ny, planner.n_theta)
+    start_time = time.time()
+
+    recorder = planner.instrumentation
+    with recorder.phase('coarse_solve', factor=factor, theta_factor=theta_factor):
+        coarse = CoarseProblem(planner, factor, theta_factor)
+        coarse_sweeps = coarse.solve(solver='multi_resolution_coarse')
+    coarse_time = time.time() - start_time
+    print(f"Coarse grid {coarse.shape} solved in {coarse_sweeps} sweeps ({coarse_time:.2f}s)")
+
+    planner.build_transition_tables()
+    active, fixed = planner._terminal_state_values()
+    V = np.where(active, coarse.upsample(fine_shape).reshape(-1), fixed).astype(planner.value_dtype)
+
+    if start_states:
+        mask = np.broadcast_to(corridor_mask(coarse, start_states, radius, fine_shape)[:, :, None], fine_shape)
+        states = np.flatnonzero(active & mask.reshape(-1))
+    else:
+        states = np.flatnonzero(active)
+    with recorder.phase('sweeps', solver='multi_resolution', states=len(states)):
+        fine_sweeps = planner._sweep_subset(V, states, solver='multi_resolution')
+    planner.V = V.reshape(fine_shape)
+    planner.extract_policy()
+    print(f"Fine grid: {len(states)} of {int(active.sum())} states swept ({fine_sweeps} sweeps)")
+
+    fallback = False
+    if start_states and any(o != 'goal' for o in planner.policy_rollouts(start_states)):
+        print("Corridor policy misses the goal from some start state, sweeping the full domain")
+        fallback = True
+        with recorder.phase('sweeps', solver='multi_resolution', states=int(active.sum())):
+            fine_sweeps += planner._sweep_subset(V, np.flatnonzero(active), solver='multi_resolution')
+        planner.V = V.reshape(fine_shape)
+        planner.extract_policy()
+
+    # Without the fallback a corridor solve is only valid near the start states
+    corridor = None
+    if start_states and not fallback:
+        corridor = {'start_states': [[int(v) for v in s] for s in start_states], 'factor': factor,
+                    'theta_factor': theta_factor, 'radius': radius}
+    return {'method': 'multi_resolution', 'coarse_shape': coarse.shape, 'coarse_iterations': coarse_sweeps,
+            'coarse_time': coarse_time, 'corridor_states': len(states), 'iterations': fine_sweeps,
+            'fallback': fallback, 'corridor': corridor, 'time': time.time() - start_time}
@@ -1,41 +1,113 @@
 import numpy as np
+import heapq
 import time
 import os
 from src import config
+from src.cache import ArtifactCache, collision_fields, model_fields
+from src.cspace import build_collision_map_exact, build_collision_map_raster
+from src.instrumentation import recorder
+from src.multigoal import GoalPolicies, solve_goals
+from src.multires import solve_multi_resolution
+from src.policy_iteration import solve_policy_iteration
+from src.replanning import update_obstacles
+from src.tables import PackedBoolMap, SparseGoalSet, count_true, dense, flat_indices, format_bytes, state_indices
+from src.tiled import map_private_copy, solve_tiled
+from src.transitions import TransitionModel, predecessor_index, q_values, rollout_outcomes, sweep_states
 
 class ValueIterationPlanner:
-    def __init__(self, environment):
+    def __init__(self, environment, compact=None):
         self.env = environment
         self.config = config
         self.nx, self.ny = config.NX, config.NY
         self.n_theta, self.n_actions = config.N_THETA, config.N_ACTIONS
-        
+        shape = (self.nx, self.ny, self.n_theta)
+
+        # Compact mode: float32 V, int8 policy, bit-packed collision map and a
+        # sparse goal set, for grids where the dense tables don't fit in memory.
+        self.compact = config.COMPACT_TABLES if compact is None else compact
+        self.value_dtype = np.float32 if self.compact else np.float64
+        self.policy_dtype = np.int8 if self.compact else int
+
         # Initialize tables. V starts at 0, policy at -1 (no action).
-        self.V = np.zeros((self.nx, self.ny, self.n_theta))
-        self.policy = np.full((self.nx, self.ny, self.n_theta), -1, dtype=int)
+        self.V = np.zeros(shape, dtype=self.value_dtype)
+        self.policy = np.full(shape, -1, dtype=self.policy_dtype)
         
         # Pre-allocate maps for quick lookups during VI loops
-        self.collision_map = np.zeros((self.nx, self.ny, self.n_theta), dtype=bool)
-        self.goal_map = np.zeros((self.nx, self.ny, self.n_theta), dtype=bool)
+        if self.compact:
+            self.collision_map = PackedBoolMap(shape)
+            self.goal_map = SparseGoalSet(shape)
+        else:
+            self.collision_map = np.zeros(shape, dtype=bool)
+            self.goal_map = np.zeros(shape, dtype=bool)
         
         gx, gy, gtheta = config.GOAL_STATE
         self.goal_map[gx, gy, gtheta] = True
 
-    def precompute_collision_map(self):
-        # This might take a minute, but it saves massive time during the VI loop 
-        # by avoiding repeated complex polygon intersection checks.
-        print("Pre-calculating Collision Map")
-        start_time = time.time()
-        count = 0
-        for x in range(self.nx):
-            if (x + 1) % 10 == 0:
-                print(f"Processing... {x + 1}/{self.nx} (collisions: {count})")
-            for y in range(self.ny):
-                for theta_idx in range(self.n_theta):
-                    if self.env.is_collision((x, y, theta_idx)):
-                        self.collision_map[x, y, theta_idx] = True
-                        count += 1
-        print(f"Done in {time.time() - start_time:.2f}s. Total collisions: {count}")
+        self.collision_method = config.COLLISION_MAP_METHOD
+        self.cache = ArtifactCache() if config.CACHE_DIR else None
+
+        # Vectorized Bellman tables, built lazily once the collision map is known
+        self.transitions = None
+        self.reward_table = None
+        self.terminal_table = None
+        # Per-goal V/policy from the multi-goal solver (GoalPolicies), if any
+        self.goal_policies = None
+        # Phase timers and per-sweep telemetry, see src/instrumentation.py
+        self.instrumentation = recorder
+        self.report_memory()
+
+    def memory_usage(self):
+        n_states = self.nx * self.ny * self.n_theta
+        return {
+            'V': self.V.nbytes,
+            'policy': self.policy.nbytes,
+            'collision_map': self.collision_map.nbytes,
+            'goal_map': self.goal_map.nbytes,
+            'transition_tables': n_states * TransitionModel.bytes_per_state(self.compact),
+        }
+
+    def report_memory(self):
+        usage = self.memory_usage()
+        mode = "compact" if self.compact else "dense"
+        tables = ", ".join(f"{name} {format_bytes(n)}" for name, n in usage.items())
+        print(f"Planner tables ({self.nx}x{self.ny}x{self.n_theta}, {mode}): {tables}")
+
+    def _set_collision_map(self, collision_map):
+        collision_map = dense(collision_map)
+        self.collision_map = PackedBoolMap.from_dense(collision_map) if self.compact else collision_map
+
+    def precompute_collision_map(self, method=None, workers=None):
+        method = method or self.config.COLLISION_MAP_METHOD
+        with self.instrumentation.phase('collision_map', method=method):
+            self._precompute_collision_map(method, workers)
+
+    def _precompute_collision_map(self, method, workers):
+        self.collision_method = method
+        self.reward_table = self.terminal_table = None
+        fields = collision_fields(self.env, method)
+        cached = self.cache.load('collision', fields, ['collision_bits']) if self.cache else None
+        if cached is not None:
+            # Stored bit-packed; compact planners use the bits directly
+            packed = PackedBoolMap((self.nx, self.ny, self.n_theta), cached['collision_bits'])
+            self.collision_map = packed if self.compact else packed.to_dense()
+            print(f"Collision map loaded from cache ({self.cache.path('collision', fields)})")
+            return
+
+        if method == 'raster':
+            print("Pre-calculating Collision Map (raster)")
+            start_time = time.time()
+            self._set_collision_map(build_collision_map_raster(self.env))
+        elif method == 'exact':
+            # Exact Shapely footprint checks, optionally spread over several processes
+            print("Pre-calculating Collision Map")
+            start_time = time.time()
+            self._set_collision_map(build_collision_map_exact(self.env, workers=workers))
+        else:
+            raise ValueError(f"Invalid collision map method: {method}")
+        print(f"Done in {time.time() - start_time:.2f}s. Total collisions: {count_true(self.collision_map)}")
+        if self.cache:
+            bits = self.collision_map.bits if self.compact else np.packbits(self.collision_map.reshape(-1))
+            self.cache.store('collision', fields, {'collision_bits': bits})
 
     def _get_next_state_reward(self, state, action):
         x, y, theta_idx = state
@@ -85,75 +157,477 @@ class ValueIterationPlanner:
 
         return next_state, base_reward + drift_penalty, False
 
-    def run_value_iteration(self):
+    def build_transition_tables(self):
+        # Successor indices only depend on the grid, rewards/terminals also
+        # depend on the collision and goal maps.
+        if self.transitions is None:
+            self.transitions = TransitionModel(self.nx, self.ny, self.n_theta, compact=self.compact)
+        self.reward_table, self.terminal_table = self.transitions.rewards(
+            self.collision_map, self.goal_map, self.config)
+
+    def _terminal_state_values(self):
+        # Collision and goal states are never updated by the Bellman backup. The mask
+        # comes from the collision bits and the goal indices, without dense copies of the maps
+        n_states = self.nx * self.ny * self.n_theta
+        if self.compact:
+            collision_flat = np.unpackbits(self.collision_map.bits, count=n_states).view(bool)
+        else:
+            collision_flat = self.collision_map.reshape(-1)
+        goal_flat = flat_indices(self.goal_map)
+        fixed = np.zeros(n_states, dtype=self.value_dtype)
+        fixed[collision_flat] = self.config.R_COLLISION
+        fixed[goal_flat] = self.config.R_GOAL
+        # The unpacked bits are a scratch array: invert them in place
+        active = np.logical_not(collision_flat, out=collision_flat if self.compact else None)
+        active[goal_flat] = False
+        return active, fixed
+
+    def _q_table(self, V_flat):
+        if self.reward_table is None:
+            self.build_transition_tables()
+        return q_values(V_flat, self.reward_table, self.terminal_table,
+                        self.transitions.next_idx, self.config.GAMMA)
+
+    def run_value_iteration(self, save=True, checkpoint_every=None, resume=False, warm_start_from=None):
+        """
+        Synchronous value iteration from the current V.
+
+        Every `checkpoint_every` sweeps (default VI_CHECKPOINT_EVERY, 0 = never)
+        V and the sweep count are written to the cache, atomically, under the
+        same config hash as the model; with `resume` the run continues from that
+        checkpoint, which gives the same result as an uninterrupted run. The
+        checkpoint is removed once the run converges. `warm_start_from` (an array,
+        a .npy file or a cached model directory) initializes V from a previously
+        solved value function of the same grid shape.
+        """
         print("\nStarting Value Iteration")
         start_time = time.time()
-        iteration = 0
-        
-        while True:
-            iteration += 1
-            delta = 0.0
-            # Use a copy for synchronous updates (standard VI stability)
-            V_old = np.copy(self.V)
-            
-            for x in range(self.nx):
-                for y in range(self.ny):
-                    for theta_idx in range(self.n_theta):
-                        state = (x, y, theta_idx)
-                        
-                        # Force terminal state values
-                        if self.collision_map[state]:
-                            self.V[state] = self.config.R_COLLISION
-                            continue
-                        if self.goal_map[state]:
-                            self.V[state] = self.config.R_GOAL
-                            continue
-
-                        # Bellman update
-                        q_values = np.full(self.n_actions, -np.inf)
-                        for action in range(self.n_actions):
-                            next_s, r, term = self._get_next_state_reward(state, action)
-                            q_values[action] = r if term else r + self.config.GAMMA * V_old[next_s]
-                        
-                        best_value = np.max(q_values)
-                        delta = max(delta, np.abs(best_value - V_old[state]))
-                        self.V[state] = best_value
-
-            print(f"Iteration {iteration}: Max Delta = {delta:.6f}")
-            if delta < self.config.VI_CONVERGENCE_THRESHOLD:
-                break
-        
-        print(f"Value Iteration finished in {iteration} iterations ({time.time() - start_time:.2f}s)")
+        self.build_transition_tables()
+        active, fixed = self._terminal_state_values()
+        checkpoint_every = self.config.VI_CHECKPOINT_EVERY if checkpoint_every is None else checkpoint_every
+        iteration, previous_time = 0, 0.0
+        # Whether V started from a warm start, and the sweeps of the source's cold solve if known
+        warm_start, source_iterations = False, None
+
+        V = self.V.reshape(-1).astype(self.value_dtype)
+        checkpoint = self._load_checkpoint() if resume else None
+        if checkpoint is not None:
+            V = np.array(checkpoint['v'], dtype=self.value_dtype).reshape(-1)
+            iteration, previous_time = int(checkpoint['iteration']), float(checkpoint['elapsed'])
+            warm_start, source_iterations = bool(checkpoint['warm_start']), checkpoint['source_iterations']
+            print(f"Resuming from the checkpoint at iteration {iteration}")
+        elif resume:
+            print("No checkpoint found for the current config, starting from the current V")
+        if checkpoint is None and warm_start_from is not None:
+            V0, source_iterations = self._warm_start_values(warm_start_from)
+            warm_start = True
+            V = np.where(active, V0.reshape(-1), fixed).astype(self.value_dtype)
+            print("Warm start from a previously solved V")
+        resumed_from = iteration
+        n_active = int(active.sum())
+
+        with self.instrumentation.phase('sweeps', solver='value_iteration'):
+            while True:
+                iteration += 1
+                sweep_start = time.perf_counter()
+                # Synchronous update: every backup reads the previous sweep's V
+                best_value = self._q_table(V).max(axis=0)
+                delta = np.max(np.abs(best_value[active] - V[active]), initial=0.0)
+                V = np.where(active, best_value, fixed)
+                self.instrumentation.sweep('value_iteration', iteration, delta, n_active,
+                                           time.perf_counter() - sweep_start)
+
+                print(f"Iteration {iteration}: Max Delta = {delta:.6f}")
+                if delta < self.config.VI_CONVERGENCE_THRESHOLD:
+                    break
+                if checkpoint_every and iteration % checkpoint_every == 0:
+                    self._save_checkpoint(V, iteration, previous_time + time.time() - start_time,
+                                          warm_start, source_iterations)
+
+        self.V = V.reshape(self.nx, self.ny, self.n_theta)
+        elapsed = time.time() - start_time
+        print(f"Value Iteration finished in {iteration} iterations ({elapsed:.2f}s)")
+        # A cold solve records its own sweep count; a warm one inherits the
+        # source's, the baseline for the sweeps saved by warm starting
+        cold_iterations = source_iterations if warm_start else iteration
+        if warm_start and source_iterations is not None:
+            print(f"Warm start saved {source_iterations - iteration} sweeps "
+                  f"({iteration} vs {source_iterations} for the source's cold solve)")
+        if self.cache and checkpoint_every:
+            self.cache.remove('checkpoint', self._model_fields())
+        self.extract_policy()
+        if save:
+            self.save_model(iterations=cold_iterations)
+        return {'method': 'value_iteration', 'iterations': iteration, 'resumed_from': resumed_from,
+                'updates': (iteration - resumed_from) * n_active, 'time': elapsed,
+                'total_time': previous_time + elapsed, 'cold_iterations': cold_iterations}
+
+    def _save_checkpoint(self, V, iteration, elapsed, warm_start, source_iterations):
+        if not self.cache:
+            return
+        arrays = {'v': V, 'iteration': np.array(iteration), 'elapsed': np.array(elapsed),
+                  'warm_start': np.array(warm_start)}
+        if source_iterations is not None:
+            arrays['source_iterations'] = np.array(source_iterations)
+        entry = self.cache.store('checkpoint', self._model_fields(), arrays)
+        print(f"Checkpoint at iteration {iteration} saved to {entry}")
+
+    def _load_checkpoint(self):
+        if not self.cache:
+            return None
+        checkpoint = self.cache.load('checkpoint', self._model_fields(), ['v', 'iteration', 'elapsed', 'warm_start'])
+        if checkpoint is not None:
+            # Only stored for a warm start whose source recorded its cold sweep count
+            source = self.cache.load('checkpoint', self._model_fields(), ['source_iterations'])
+            checkpoint['source_iterations'] = None if source is None else int(source['source_iterations'])
+        return checkpoint
+
+    def _warm_start_values(self, source):
+        # (V, sweeps of the source's cold solve or None) from an array, .npy file or model directory
+        iterations = None
+        if isinstance(source, str) and os.path.isdir(source):
+            record = os.path.join(source, 'iterations.npy')
+            iterations = int(np.load(record)) if os.path.exists(record) else None
+            source = os.path.join(source, 'v.npy')
+        V0 = np.load(source, mmap_mode='r') if isinstance(source, str) else np.asarray(source)
+        shape = (self.nx, self.ny, self.n_theta)
+        if V0.size != self.nx * self.ny * self.n_theta or V0.shape not in (shape, (V0.size,)):
+            raise ValueError(f"Warm start V has shape {V0.shape}, the grid is {shape}")
+        return V0, iterations
+
+    def solve(self, method='value_iteration', save=True, **options):
+        solvers = {
+            'value_iteration': self.run_value_iteration,
+            'backward_dijkstra': self.run_backward_dijkstra,
+            'prioritized_sweeping': self.run_prioritized_sweeping,
+            'multi_resolution': self.run_multi_resolution,
+            'multi_goal': self.run_multi_goal,
+            'policy_iteration': self.run_policy_iteration,
+            'tiled': self.run_tiled,
+        }
+        if method not in solvers:
+            raise ValueError(f"Invalid solver method: {method}")
+        return solvers[method](save=save, **options)
+
+    def run_multi_resolution(self, start_states=None, save=True, **options):
+        # Coarse-to-fine solve, see src/multires.py
+        print("\nStarting Multi-Resolution Planning")
+        stats = solve_multi_resolution(self, start_states, **options)
+        print(f"Multi-Resolution Planning finished in {stats['time']:.2f}s")
+        if save and stats['corridor'] is not None:
+            # Only valid near the start states: cached apart from the full models, never loaded as one
+            if self.cache:
+                fields = self._model_fields()
+                fields['corridor'] = stats['corridor']
+                entry = self.cache.store('corridor', fields, {'v': self.V, 'policy': self.policy})
+                print(f"Corridor solve saved to {entry} (not used as the model)")
+        elif save:
+            self.save_model()
+        return stats
+
+    def run_tiled(self, save=True, **options):
+        # Out-of-core value iteration on memory-mapped tiles, see src/tiled.py. It
+        # builds the raster collision map tile by tile, so the planner must use that method
+        if self.collision_method != 'raster':
+            raise ValueError(f"The tiled solver uses the raster collision map, the planner uses "
+                             f"'{self.collision_method}' (set collision_method = 'raster')")
+        stats = solve_tiled(self.env, goals=state_indices(self.goal_map), compact=self.compact, **options)
+        self.V = np.load(os.path.join(stats['directory'], 'v.npy'), mmap_mode='r')
+        self.policy = np.load(os.path.join(stats['directory'], 'policy.npy'), mmap_mode='r')
+        if save:
+            self.save_model()
+        # The next tiled solve rewrites the output files: map the cache entry instead,
+        # or a private copy of the files, never reading the tables into memory
+        cached = self.cache.load('model', self._model_fields(), ['v', 'policy']) if save and self.cache else None
+        if cached is None:
+            cached = map_private_copy(stats['directory'])
+        self.V, self.policy = cached['v'], cached['policy']
+        return stats
+
+    def run_policy_iteration(self, evaluation=None, backups=None, save=True):
+        # Exact (sparse solve) or modified policy iteration, see src/policy_iteration.py
+        evaluation = evaluation or self.config.PI_EVALUATION
+        print(f"\nStarting Policy Iteration ({evaluation} evaluation)")
+        V, policy, stats = solve_policy_iteration(self, evaluation, backups or self.config.PI_BACKUPS)
+        shape = (self.nx, self.ny, self.n_theta)
+        self.V = V.reshape(shape)
+        self.policy = policy.reshape(shape).astype(self.policy_dtype)
+        print(f"Policy Iteration finished in {stats['iterations']} improvements ({stats['time']:.2f}s)")
+        if save:
+            self.save_model()
+        return stats
+
+    def run_multi_goal(self, goal_states=None, save=True):
+        # Batched VI for several goals, see src/multigoal.py
+        goal_states = goal_states or self.config.GOAL_STATES
+        print(f"\nStarting Multi-Goal Value Iteration ({len(goal_states)} goals)")
+        self.goal_policies, stats = solve_goals(self, goal_states)
+        print(f"Multi-Goal Value Iteration finished in {stats['sweeps']} sweeps ({stats['time']:.2f}s), "
+              f"per goal: {stats['iterations']}")
+        if save:
+            self.save_goal_policies()
+        self.select_goal(self.goal_policies.goal_states[0])
+        return stats
+
+    def select_goal(self, goal_state):
+        """
+        Switches V, policy and the goal (planner and environment) to one of the
+        goals solved by `run_multi_goal`, without re-planning.
+        """
+        k = self.goal_policies.index(goal_state)
+        self.V, self.policy = self.goal_policies.V[k], self.goal_policies.policy[k]
+        shape = (self.nx, self.ny, self.n_theta)
+        self.goal_map = SparseGoalSet(shape) if self.compact else np.zeros(shape, dtype=bool)
+        self.goal_map[tuple(goal_state)] = True
+        self.env.goal_state = tuple(goal_state)
+        self.reward_table = self.terminal_table = None
+
+    def _goal_policies_fields(self, goal_states):
+        fields = model_fields(self.env, self.goal_map, self.collision_method)
+        fields.update({'goal': [list(g) for g in goal_states], 'compact': self.compact})
+        return fields
+
+    def save_goal_policies(self):
+        if not self.cache:
+            return
+        fields = self._goal_policies_fields(self.goal_policies.goal_states)
+        entry = self.cache.store('multigoal', fields, {'v': self.goal_policies.V, 'policy': self.goal_policies.policy})
+        print(f"Goal policies saved to {entry}")
+
+    def load_goal_policies(self, goal_states=None):
+        goal_states = [tuple(g) for g in (goal_states or self.config.GOAL_STATES)]
+        fields = self._goal_policies_fields(goal_states)
+        cached = self.cache.load('multigoal', fields, ['v', 'policy']) if self.cache else None
+        if cached is None:
+            print("No cached goal policies match the current config.")
+            return False
+        self.goal_policies = GoalPolicies(goal_states, cached['v'], cached['policy'])
+        self.select_goal(goal_states[0])
+        print(f"Goal policies loaded from cache ({self.cache.path('multigoal', fields)})")
+        return True
+
+    def update_obstacles(self, added=(), removed=()):
+        # Local collision map + value repair, see src/replanning.py
+        return update_obstacles(self, added, removed)
+
+    def _sweep_subset(self, V, states, solver=None):
+        # Synchronous VI restricted to `states`, every other entry of V held fixed
+        return sweep_states(V, states, self.transitions.next_idx, self.reward_table,
+                            self.terminal_table, self.config.GAMMA, self.config.VI_CONVERGENCE_THRESHOLD, solver)
+
+    def policy_rollouts(self, start_states, max_steps=None):
+        """
+        Follows the current policy on the discrete transition tables from each
+        start state. Returns one outcome per start: 'goal', 'collision', 'stall'
+        (policy -1 outside the goal) or 'timeout'.
+        """
+        if self.reward_table is None:
+            self.build_transition_tables()
+        goal_flat = dense(self.goal_map).reshape(-1)
+        next_idx, terminal = self.transitions.next_idx, self.terminal_table
+        reached = terminal & ~self.transitions.out_of_bounds & goal_flat[next_idx]
+        states = np.ravel_multi_index(np.asarray(start_states).T, (self.nx, self.ny, self.n_theta))
+        return rollout_outcomes(np.asarray(self.policy).reshape(-1), states, next_idx, terminal,
+                                reached, goal_flat, max_steps or self.nx * self.ny)
+
+    def run_backward_dijkstra(self, save=True):
+        """
+        Solves the deterministic MDP by expanding states backwards from the goal in
+        decreasing order of value, like Dijkstra on the reverse transition graph.
+
+        A state's value is final when popped as long as it is at least
+        r_max / (1 - GAMMA), r_max being the largest non-terminal reward: above that
+        bound the optimal trajectory must end in a terminal transition and values
+        only increase along it, which is the condition Dijkstra needs under
+        discounting. States below the bound (those that can't do better than
+        looping forever) are finished with value iteration over that residual set.
+        """
+        print("\nStarting Backward Dijkstra")
+        start_time = time.time()
+        self.build_transition_tables()
+        active, fixed = self._terminal_state_values()
+        gamma = self.config.GAMMA
+        reward, terminal = self.reward_table, self.terminal_table
+
+        edges = ~terminal & active[None, :]
+        indptr, pred_state, pred_action = predecessor_index(self.transitions.next_idx, edges, len(active))
+        pred_reward = reward[pred_action, pred_state]
+        r_max = reward[edges].max() if edges.any() else 0.0
+        threshold = r_max / (1.0 - gamma) if r_max < 0 else np.inf
+
+        # Seed every state with its best terminal transition (goal or collision)
+        best = np.where(terminal, reward, -np.inf).max(axis=0)
+        best[~active] = -np.inf
+        heap = [(-v, s) for s, v in zip(np.flatnonzero(np.isfinite(best)), best[np.isfinite(best)])]
+        heapq.heapify(heap)
+
+        V = fixed.copy()
+        settled = ~active
+        best, settled_list = best.tolist(), settled.tolist()
+        indptr, pred_state, pred_reward = indptr.tolist(), pred_state.tolist(), pred_reward.tolist()
+        expanded = 0
+        with self.instrumentation.phase('expansion', solver='backward_dijkstra'):
+            while heap:
+                neg_value, s = heap[0]
+                value = -neg_value
+                if value < threshold:
+                    break
+                heapq.heappop(heap)
+                if settled_list[s]:
+                    continue
+                settled_list[s] = True
+                V[s] = value
+                expanded += 1
+                for k in range(indptr[s], indptr[s + 1]):
+                    p = pred_state[k]
+                    if settled_list[p]:
+                        continue
+                    candidate = pred_reward[k] + gamma * value
+                    if candidate > best[p]:
+                        best[p] = candidate
+                        heapq.heappush(heap, (-candidate, p))
+
+        residual = np.flatnonzero(~np.array(settled_list))
+        best = np.array(best)
+        V[residual] = np.where(np.isfinite(best[residual]), best[residual], self.config.R_COLLISION)
+        with self.instrumentation.phase('sweeps', solver='backward_dijkstra'):
+            sweeps = self._sweep_subset(V, residual, solver='backward_dijkstra')
+
+        self.V = V.reshape(self.nx, self.ny, self.n_theta)
+        elapsed = time.time() - start_time
+        print(f"Backward Dijkstra expanded {expanded} of {int(active.sum())} states "
+              f"({len(residual)} left to {sweeps} residual sweeps) in {elapsed:.2f}s")
+        self.extract_policy()
+        if save:
+            self.save_model()
+        return {'method': 'backward_dijkstra', 'expanded': expanded,
+                'residual': len(residual), 'iterations': sweeps, 'time': elapsed}
+
+    def run_prioritized_sweeping(self, threshold=None, save=True):
+        """
+        Asynchronous (Gauss-Seidel) value iteration that updates V in place.
+
+        States are kept in a priority queue ordered by Bellman error. Popping a
+        state backs it up in place; only when its value moves by more than
+        `threshold` are its predecessors re-evaluated and queued. Starting from the
+        current V, small reward or goal changes only touch the states they affect.
+        `backups` counts every Bellman backup (the initial full one, every pop and
+        every predecessor re-evaluation), `updates` the backups written to V. Stats
+        are printed every time the backups grow by one sweep's worth.
+        """
+        print("\nStarting Prioritized Sweeping")
+        start_time = time.time()
+        threshold = self.config.VI_CONVERGENCE_THRESHOLD if threshold is None else threshold
+        self.build_transition_tables()
+        active, fixed = self._terminal_state_values()
+        gamma = self.config.GAMMA
+
+        V_flat = np.where(active, self.V.reshape(-1), fixed)
+        error = np.abs(self._q_table(V_flat).max(axis=0) - V_flat)
+        error[~active] = 0.0
+        queued = np.flatnonzero(error > threshold)
+        heap = list(zip((-error[queued]).tolist(), queued.tolist()))
+        heapq.heapify(heap)
+
+        edges = ~self.terminal_table & active[None, :]
+        indptr, pred_state, _ = predecessor_index(self.transitions.next_idx, edges, len(active))
+        indptr, pred_state = indptr.tolist(), pred_state.tolist()
+        actions = range(self.n_actions)
+        next_idx = [self.transitions.next_idx[a].tolist() for a in actions]
+        reward = [self.reward_table[a].tolist() for a in actions]
+        terminal = [self.terminal_table[a].tolist() for a in actions]
+        V = V_flat.tolist()
+
+        def backup(s):
+            best = -np.inf
+            for a in actions:
+                q = reward[a][s] if terminal[a][s] else reward[a][s] + gamma * V[next_idx[a][s]]
+                if q > best:
+                    best = q
+            return best
+
+        n_active = int(active.sum())
+        # The initial Bellman errors are one full sweep of backups
+        updates, backups = 0, n_active
+        report_at = 2 * n_active
+        sweep_start = time.perf_counter()
+        with self.instrumentation.phase('sweeps', solver='prioritized_sweeping'):
+            while heap:
+                _, s = heapq.heappop(heap)
+                new_value = backup(s)
+                backups += 1
+                change = abs(new_value - V[s])
+                if change <= threshold:
+                    continue
+                V[s] = new_value
+                updates += 1
+                backups += indptr[s + 1] - indptr[s]
+                for k in range(indptr[s], indptr[s + 1]):
+                    p = pred_state[k]
+                    p_error = abs(backup(p) - V[p])
+                    if p_error > threshold:
+                        heapq.heappush(heap, (-p_error, p))
+                if backups >= report_at:
+                    # One sweep's worth of backups, reported as a sweep with the queue's max error
+                    report_at += n_active
+                    top = -heap[0][0] if heap else 0.0
+                    self.instrumentation.sweep('prioritized_sweeping', backups // n_active, top, n_active,
+                                               time.perf_counter() - sweep_start)
+                    sweep_start = time.perf_counter()
+                    print(f"Backups {backups} ({backups / n_active:.1f} sweeps, {updates} written): "
+                          f"queue = {len(heap)}, max error = {top:.6f}")
+
+        self.V = np.array(V, dtype=self.value_dtype).reshape(self.nx, self.ny, self.n_theta)
+        elapsed = time.time() - start_time
+        print(f"Prioritized Sweeping finished after {backups} backups "
+              f"({backups / n_active:.2f} sweeps, {updates} written, {elapsed:.2f}s)")
         self.extract_policy()
-        self.save_model()
+        if save:
+            self.save_model()
+        return {'method': 'prioritized_sweeping', 'updates': updates, 'backups': int(backups),
+                'iterations': backups / n_active, 'time': elapsed}
 
     def extract_policy(self):
         print("Extracting optimal policy...")
-        # Re-run one pass of Q-value calculation to find the best action for each state
-        for x in range(self.nx):
-            for y in range(self.ny):
-                for theta_idx in range(self.n_theta):
-                    state = (x, y, theta_idx)
-                    if self.collision_map[state] or self.goal_map[state]:
-                        self.policy[state] = -1
-                        continue
-                    
-                    q_values = np.full(self.n_actions, -np.inf)
-                    for action in range(self.n_actions):
-                        next_s, r, term = self._get_next_state_reward(state, action)
-                        q_values[action] = r if term else r + self.config.GAMMA * self.V[next_s]
-                    
-                    # argmax gives us the action index with the highest expected return
-                    self.policy[state] = np.argmax(q_values)
+        with self.instrumentation.phase('policy_extraction'):
+            # One pass of Q-value calculation over the same tables used by the sweeps
+            active, _ = self._terminal_state_values()
+            best_action = np.argmax(self._q_table(self.V.reshape(-1)), axis=0)
+            policy = np.where(active, best_action, -1)
+            self.policy = policy.reshape(self.nx, self.ny, self.n_theta).astype(self.policy_dtype)
         print("Policy extracted.")
 
-    def save_model(self, v_file='v.npy', policy_file='policy.npy'):
+    def _model_fields(self):
+        fields = model_fields(self.env, self.goal_map, self.collision_method)
+        fields['compact'] = self.compact
+        return fields
+
+    def save_model(self, v_file=None, policy_file=None, iterations=None):
+        # Without explicit paths the model goes to the cache, keyed by the config
+        if v_file is None and policy_file is None and self.cache:
+            arrays = {'v': self.V, 'policy': self.policy}
+            if iterations is not None:
+                arrays['iterations'] = np.array(iterations)
+            entry = self.cache.store('model', self._model_fields(), arrays)
+            print(f"Model saved to {entry}")
+            return
+        v_file, policy_file = v_file or 'v.npy', policy_file or 'policy.npy'
         print(f"Saving model to {v_file} and {policy_file}...")
         np.save(v_file, self.V)
         np.save(policy_file, self.policy)
         print("Save complete.")
 
-    def load_model(self, v_file='v.npy', policy_file='policy.npy'):
+    def load_model(self, v_file=None, policy_file=None):
+        if v_file is None and policy_file is None and self.cache:
+            fields = self._model_fields()
+            cached = self.cache.load('model', fields, ['v', 'policy'])
+            if cached is not None:
+                self.V, self.policy = cached['v'], cached['policy']
+                print(f"Model loaded from cache ({self.cache.path('model', fields)})")
+                return True
+            print("No cached model matches the current config. Starting fresh training.")
+            return False
+        v_file, policy_file = v_file or 'v.npy', policy_file or 'policy.npy'
         if os.path.exists(v_file) and os.path.exists(policy_file):
             print(f"Loading model from {v_file} and {policy_file}...")
             self.V = np.load(v_file)
@@ -161,4 +635,4 @@ class ValueIterationPlanner:
             print("Load complete.")
             return True
         print("Model files not found. Starting fresh training.")
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,325 @@
+"""
+Low-latency policy queries for external controllers.
+
+`PolicyTable` memory-maps a solved model from the cache (policy.npy, v.npy and
+the meta.json describing its grid) and answers batches of continuous
+(x, y, theta_idx) poses with the same rounding and clamping as
+`src.simulation.simulate_policy`. `PolicyService` keeps the current table, hot-reloads a
+newer model as soon as one is written to the cache and records per-request
+latency; it is served over localhost HTTP or a Unix socket (one JSON request
+per line). Only NumPy and the standard library are imported: no Shapely,
+Matplotlib or planner startup.
+
+    python -m src.policy_service [--model DIR] [--port 8765 | --unix PATH]
+
+HTTP: POST /query {"states": [[x, y, theta_idx], ...]} -> {"actions": [...], "values": [...]},
+GET /stats, GET /health. Unix socket: {"states": [...]} or {"stats": true} per line.
+"""
+import argparse
+import glob
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from src import config
+
+
+def model_signature(model_dir):
+    # Changes whenever the entry is rewritten: the cache renames a new directory into place
+    policy = os.stat(os.path.join(model_dir, 'policy.npy'))
+    return os.stat(model_dir).st_ino, policy.st_mtime_ns, policy.st_size
+
+
+# meta.json fields a hot reload has to keep: grid, footprint, map, goal and collision method.
+# Rewards, GAMMA and the threshold may change, that is what re-solving is for
+RELOAD_MATCH_FIELDS = ('shape', 'delta_theta_deg', 'robot', 'obstacles', 'goal', 'method')
+
+
+def read_meta(model_dir):
+    with open(os.path.join(model_dir, 'meta.json')) as f:
+        return json.load(f)
+
+
+def matches(model_dir, match):
+    try:
+        meta = read_meta(model_dir)
+    except (OSError, ValueError):
+        return False
+    return all(meta.get(name) == value for name, value in match.items())
+
+
+def latest_model(cache_dir=None, match=None):
+    # Most recently written model entry of the cache whose meta.json has the
+    # values of `match` (a dict of fields), None if there is none
+    entries = [d for d in glob.glob(os.path.join(cache_dir or config.CACHE_DIR, 'model-*'))
+               if os.path.exists(os.path.join(d, 'policy.npy')) and (not match or matches(d, match))]
+    return max(entries, key=os.path.getmtime) if entries else None
+
+
+class PolicyTable:
+    """A solved policy/V pair mapped read-only from a model directory."""
+
+    def __init__(self, model_dir):
+        self.model_dir = model_dir
+        self.meta = read_meta(model_dir)
+        self.policy = np.load(os.path.join(model_dir, 'policy.npy'), mmap_mode='r')
+        self.V = np.load(os.path.join(model_dir, 'v.npy'), mmap_mode='r')
+        self.nx, self.ny, self.n_theta = self.policy.shape
+        if list(self.policy.shape) != list(self.meta['shape']) or self.V.shape != self.policy.shape:
+            raise ValueError(f"Model in {model_dir} doesn't match its metadata shape {self.meta['shape']}")
+        self.signature = model_signature(model_dir)
+
+    def lookup(self, states):
+        """
+        (actions, values) for an (N, 3) array of poses. Positions are rounded to
+        the nearest cell and clamped to the grid like simulate_policy; headings
+        are heading indices, rounded and wrapped.
+        """
+        states = np.asarray(states, dtype=float).reshape(-1, 3)
+        ix = np.clip(np.round(states[:, 0]).astype(np.int64), 0, self.nx - 1)
+        iy = np.clip(np.round(states[:, 1]).astype(np.int64), 0, self.ny - 1)
+        it = np.round(states[:, 2]).astype(np.int64) % self.n_theta
+        return self.policy[ix, iy, it], self.V[ix, iy, it]
+
+    def describe(self):
+        return {'model': self.model_dir, 'shape': [self.nx, self.ny, self.n_theta],
+                'delta_theta_deg': self.meta.get('delta_theta_deg'), 'goal': self.meta.get('goal'),
+                'actions': config.ACTIONS}
+
+
+class LatencyStats:
+    """Service time of the last `window` requests and the queries they carried."""
+
+    def __init__(self, window=100000):
+        self.samples = deque(maxlen=window)  # (end time, seconds, queries)
+        self.lock = threading.Lock()
+        self.requests = self.queries = 0
+
+    def record(self, seconds, queries):
+        with self.lock:
+            self.samples.append((time.perf_counter(), seconds, queries))
+            self.requests += 1
+            self.queries += queries
+
+    def summary(self):
+        with self.lock:
+            samples = list(self.samples)
+        if not samples:
+            return {'requests': 0, 'queries': 0}
+        latency = np.array([s[1] for s in samples])
+        span = max(samples[-1][0] - samples[0][0] + samples[0][1], 1e-9)
+        return {
+            'requests': self.requests, 'queries': self.queries,
+            'p50_ms': 1e3 * float(np.percentile(latency, 50)), 'p99_ms': 1e3 * float(np.percentile(latency, 99)),
+            # Over the samples in the window, from the first request's start to the last one's end
+            'requests_per_second': len(samples) / span, 'queries_per_second': sum(s[2] for s in samples) / span,
+        }
+
+
+class PolicyService:
+    """
+    Serves the table of `model_dir`, or of the newest cached model when it is
+    None. Every `reload_interval` seconds a watcher thread checks for a newer
+    model and swaps the table in one assignment: in-flight requests finish on
+    the old mapping, which stays valid even after the cache replaces its files.
+    Only `model_dir` itself is reloaded when it is given; otherwise the newest
+    cached model with the same RELOAD_MATCH_FIELDS as the first one served.
+    """
+
+    def __init__(self, model_dir=None, cache_dir=None, reload_interval=None):
+        self.model_dir, self.cache_dir = model_dir, cache_dir
+        self.reload_interval = config.SERVICE_RELOAD_INTERVAL if reload_interval is None else reload_interval
+        source = model_dir or latest_model(cache_dir)
+        if source is None:
+            raise FileNotFoundError(f"No solved model in {cache_dir or config.CACHE_DIR}, run main.py first")
+        self.table = PolicyTable(source)
+        self.match = {name: self.table.meta.get(name) for name in RELOAD_MATCH_FIELDS}
+        self.stats = LatencyStats()
+        self.reloads = 0
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def query(self, states):
+        start = time.perf_counter()
+        actions, values = self.table.lookup(states)
+        self.stats.record(time.perf_counter() - start, len(actions))
+        return actions, values
+
+    def maybe_reload(self):
+        # Swap in a newer (or rewritten) model; keep serving the old one on any error
+        source = self.model_dir or latest_model(self.cache_dir, self.match)
+        try:
+            if source is None or (source == self.table.model_dir and model_signature(source) == self.table.signature):
+                return False
+            table = PolicyTable(source)
+        except (OSError, ValueError) as e:
+            print(f"Reload of {source} skipped: {e}")
+            return False
+        self.table = table
+        self.reloads += 1
+        print(f"Reloaded model {source}")
+        return True
+
+    def start_watcher(self):
+        if self.reload_interval and self._watcher is None:
+            def watch():
+                while not self._stop.wait(self.reload_interval):
+                    self.maybe_reload()
+            self._watcher = threading.Thread(target=watch, daemon=True)
+            self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def handle(self, request):
+        # One decoded JSON request -> JSON-serializable reply
+        if request.get('stats'):
+            return self.report()
+        actions, values = self.query(np.asarray(request['states'], dtype=float))
+        return {'actions': actions.tolist(), 'values': values.tolist()}
+
+    def report(self):
+        summary = self.stats.summary()
+        summary.update(self.table.describe())
+        summary['reloads'] = self.reloads
+        return summary
+
+
+def _http_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            # Small replies: don't let Nagle's algorithm hold them back
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self.reply(200, service.report())
+            elif self.path == '/health':
+                self.reply(200, {'status': 'ok', 'model': service.table.model_dir})
+            else:
+                self.reply(404, {'error': f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != '/query':
+                return self.reply(404, {'error': f"Unknown path {self.path}"})
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                self.reply(200, service.handle(request))
+            except (ValueError, KeyError, TypeError) as e:
+                self.reply(400, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def _unix_handler(service):
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                try:
+                    reply = service.handle(json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    reply = {'error': str(e)}
+                self.wfile.write(json.dumps(reply).encode() + b'\n')
+                self.wfile.flush()
+
+    return Handler
+
+
+def make_server(service, port=None, unix=None):
+    # Threading server on localhost:`port` (HTTP) or on the Unix socket `unix` (JSON lines)
+    if unix:
+        if os.path.exists(unix):
+            os.remove(unix)
+        return socketserver.ThreadingUnixStreamServer(unix, _unix_handler(service))
+    server = ThreadingHTTPServer(('127.0.0.1', port or config.SERVICE_PORT), _http_handler(service))
+    server.daemon_threads = True
+    return server
+
+
+class PolicyClient:
+    """Minimal client for either transport, keeping one connection open."""
+
+    def __init__(self, port=None, unix=None):
+        self.unix = unix
+        if unix:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(unix)
+            self.reader = self.sock.makefile('rb')
+        else:
+            import http.client
+            self.conn = http.client.HTTPConnection('127.0.0.1', port or config.SERVICE_PORT)
+            self.conn.connect()
+            self.conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _request(self, payload):
+        if self.unix:
+            self.sock.sendall(json.dumps(payload).encode() + b'\n')
+            return json.loads(self.reader.readline())
+        if payload.get('stats'):
+            self.conn.request('GET', '/stats')
+        else:
+            self.conn.request('POST', '/query', body=json.dumps(payload).encode(),
+                              headers={'Content-Type': 'application/json'})
+        return json.loads(self.conn.getresponse().read())
+
+    def query(self, states):
+        reply = self._request({'states': np.asarray(states, dtype=float).reshape(-1, 3).tolist()})
+        return np.array(reply['actions']), np.array(reply['values'])
+
+    def stats(self):
+        return self._request({'stats': True})
+
+    def close(self):
+        if self.unix:
+            self.reader.close()
+            self.sock.close()
+        else:
+            self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--model', help="model directory to serve (default: newest model in the cache)")
+    parser.add_argument('--cache-dir', default=None, help="cache directory to watch (default CACHE_DIR)")
+    parser.add_argument('--port', type=int, default=None, help="localhost HTTP port (default SERVICE_PORT)")
+    parser.add_argument('--unix', default=None, help="serve JSON lines on this Unix socket instead of HTTP")
+    parser.add_argument('--reload-interval', type=float, default=None,
+                        help="seconds between checks for a newer model, 0 = never")
+    args = parser.parse_args()
+
+    service = PolicyService(args.model, args.cache_dir, args.reload_interval)
+    service.start_watcher()
+    server = make_server(service, args.port, args.unix)
+    where = args.unix or f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"Serving {service.table.model_dir} on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
+        print(json.dumps(service.report(), indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import time
+import numpy as np
+from src.planning import ValueIterationPlanner
+from src.simulation import random_free_starts
+from src.tables import dense
+from src.transitions import rollout_outcomes
+
+
+class QLearningPlanner(ValueIterationPlanner):
+    """
+    Model-free tabular Q-learning on the same grid MDP as ValueIterationPlanner.
+
+    `n_envs` episodes run in lockstep: every step picks epsilon-greedy actions
+    for all of them, samples the transitions from the precomputed successor /
+    reward tables (built from the collision map, exactly the dynamics of
+    `_get_next_state_reward`) and applies one batched Q update. Finished episodes
+    restart from a random free state. The learned `policy` (argmax Q, -1 on
+    collision and goal states) and `V` (max Q) have the same format as the value
+    iteration ones, so simulate_policy and run_policy_tests work unchanged.
+    """
+
+    def __init__(self, environment, n_envs=None, seed=0, compact=None, n_episodes=None):
+        super().__init__(environment, compact)
+        self.n_envs = n_envs or self.config.Q_N_ENVS
+        self.rng = np.random.default_rng(seed)
+        self.Q = None
+        # Episodes the model was trained for, part of its cache key: load_model
+        # looks for a model of `n_episodes` (default N_EPISODES)
+        self.n_episodes = n_episodes or self.config.N_EPISODES
+
+    def solve(self, method='q_learning', save=True, **options):
+        if method == 'q_learning':
+            return self.run_q_learning(save=save, **options)
+        return super().solve(method, save=save, **options)
+
+    def epsilon(self, episodes):
+        # Linear decay from EPSILON_START to EPSILON_END over EPSILON_DECAY_STEPS episodes
+        fraction = min(1.0, episodes / self.config.EPSILON_DECAY_STEPS)
+        return self.config.EPSILON_START + fraction * (self.config.EPSILON_END - self.config.EPSILON_START)
+
+    def run_q_learning(self, n_episodes=None, eval_every=None, eval_starts=1000, target_success=None, save=True):
+        """
+        Trains for `n_episodes` (default N_EPISODES). Every `eval_every` finished
+        episodes the greedy policy is rolled out from `eval_starts` fixed random
+        free states and a learning-curve point is recorded; with `target_success`
+        training stops at the first evaluation that reaches it. The episodes
+        actually finished (a few more than `n_episodes` when several end in the
+        same step, fewer after an early stop) are added to `self.n_episodes`,
+        which keys the saved model.
+        """
+        cfg = self.config
+        n_episodes = n_episodes or cfg.N_EPISODES
+        eval_every = eval_every or cfg.Q_EVAL_EVERY
+        print(f"\nStarting Q-Learning ({self.n_envs} parallel environments, {n_episodes} episodes)")
+        start_time = time.time()
+        self.build_transition_tables()
+        next_idx, reward, terminal = self.transitions.next_idx, self.reward_table, self.terminal_table
+        active, _ = self._terminal_state_values()
+        goal_flat = dense(self.goal_map).reshape(-1)
+        reached = terminal & ~self.transitions.out_of_bounds & goal_flat[next_idx]
+        shape = (self.nx, self.ny, self.n_theta)
+        free = np.flatnonzero(active)
+        evaluation = np.ravel_multi_index(random_free_starts(self, eval_starts).T, shape)
+
+        if self.Q is None:
+            self.Q = np.full((len(active), self.n_actions), self.config.Q_INIT, dtype=self.value_dtype)
+            self.n_episodes = 0
+        Q, gamma, alpha = self.Q, cfg.GAMMA, cfg.ALPHA
+        envs = np.arange(self.n_envs)
+        state = self.rng.choice(free, self.n_envs)
+        steps = np.zeros(self.n_envs, dtype=np.int64)
+        returns = np.zeros(self.n_envs)
+        finished, total_steps = 0, 0
+        recent_returns, recent_goals = [], 0
+        curve, next_eval = [], eval_every
+
+        while finished < n_episodes:
+            epsilon = self.epsilon(finished)
+            explore = self.rng.random(self.n_envs) < epsilon
+            action = np.where(explore, self.rng.integers(0, self.n_actions, self.n_envs), Q[state].argmax(axis=1))
+            nxt, r, done = next_idx[action, state], reward[action, state], terminal[action, state]
+
+            # Duplicate (state, action) pairs within a batch keep the last update
+            target = np.where(done, r, r + gamma * Q[nxt].max(axis=1))
+            Q[state, action] += alpha * (target - Q[state, action])
+
+            returns += r * gamma ** steps
+            steps += 1
+            total_steps += self.n_envs
+            ended = done | (steps >= cfg.MAX_STEPS_PER_EPISODE)
+            if ended.any():
+                idx = envs[ended]
+                finished += len(idx)
+                recent_returns.extend(returns[idx].tolist())
+                recent_goals += int(np.count_nonzero(reached[action[idx], state[idx]]))
+                nxt[idx] = self.rng.choice(free, len(idx))
+                steps[idx], returns[idx] = 0, 0.0
+            state = nxt
+
+            if finished >= next_eval or finished >= n_episodes:
+                next_eval += eval_every
+                policy = np.where(active, Q.argmax(axis=1), -1)
+                outcomes = rollout_outcomes(policy, evaluation, next_idx, terminal, reached, goal_flat,
+                                            self.nx * self.ny)
+                point = {
+                    'episodes': finished, 'steps': total_steps, 'time': time.time() - start_time,
+                    'epsilon': epsilon, 'mean_return': float(np.mean(recent_returns)) if recent_returns else 0.0,
+                    'episode_goal_rate': recent_goals / max(1, len(recent_returns)),
+                    'success_rate': outcomes.count('goal') / len(outcomes),
+                }
+                curve.append(point)
+                recent_returns, recent_goals = [], 0
+                print(f"Episodes {finished}: {finished / point['time']:.0f} episodes/s, epsilon = {epsilon:.3f}, "
+                      f"mean return = {point['mean_return']:.2f}, "
+                      f"episodes reaching the goal = {100 * point['episode_goal_rate']:.2f}%, greedy success = {100 * point['success_rate']:.1f}%")
+                if target_success is not None and point['success_rate'] >= target_success:
+                    break
+
+        elapsed = time.time() - start_time
+        self.n_episodes += finished
+        self.V = Q.max(axis=1).reshape(shape)
+        self.policy = np.where(active, Q.argmax(axis=1), -1).reshape(shape).astype(self.policy_dtype)
+        print(f"Q-Learning finished: {finished} episodes, {total_steps} steps in {elapsed:.2f}s "
+              f"({finished / elapsed:.0f} episodes/s, {total_steps / elapsed:.0f} steps/s)")
+        if save:
+            self.save_model()
+        return {'method': 'q_learning', 'episodes': finished, 'steps': total_steps, 'time': elapsed,
+                'episodes_per_second': finished / elapsed, 'curve': curve}
+
+    def _model_fields(self):
+        # Keep learned models apart from the value-iteration ones in the cache
+        fields = super()._model_fields()
+        fields.update({'solver': 'q_learning', 'alpha': self.config.ALPHA, 'episodes': self.n_episodes})
+        return fields
@@ -0,0 +1,119 @@
+"""
+Batch rendering of simulation outputs and value-function maps.
+
+All plots are independent, so `render_batch` hands them to a pool of worker
+processes that draw with headless (Agg) Matplotlib figures. V and the policy are
+passed to the workers as .npy files and memory-mapped there, never pickled, so
+the render time scales with the number of cores rather than with the number of
+scenarios.
+"""
+import mmap
+import os
+import tempfile
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from src import config
+from src.instrumentation import recorder
+
+# Render jobs are (kind, title, payload) tuples: a path for 'path'/'animation',
+# a heading index for 'value_map'/'policy_map'
+JOB_KINDS = ('path', 'animation', 'value_map', 'policy_map')
+
+
+def scenario_jobs(name, path, animate=True):
+    # Static plot (Sim_<name>) and optionally GIF (Anim_<name>) of one trajectory
+    jobs = [('path', f"Sim_{name}", path)]
+    if animate:
+        jobs.append(('animation', f"Anim_{name}", path))
+    return jobs
+
+
+def map_jobs(headings=None):
+    # V heatmap and policy map for each heading index
+    headings = config.RENDER_HEADINGS if headings is None else headings
+    return [(kind, None, theta_idx) for theta_idx in headings for kind in ('value_map', 'policy_map')]
+
+
+_env = None
+_arrays = {}
+
+
+def _init_worker(env, files):
+    global _env, _arrays
+    _env = env
+    _arrays = {name: np.load(f, mmap_mode='r') for name, f in files.items()}
+
+
+def _render(job):
+    from src.visualizer import animate_path, plot_policy_map, plot_static_path, plot_value_map
+
+    kind, title, payload = job
+    start = time.time()
+    if kind == 'path':
+        filename = plot_static_path(_env, payload, title=title)
+    elif kind == 'animation':
+        filename = animate_path(_env, payload, title=title)
+    elif kind == 'value_map':
+        filename = plot_value_map(_env, _arrays['v'], payload, title=title)
+    else:
+        filename = plot_policy_map(_env, _arrays['policy'], payload, title=title)
+    return kind, filename, time.time() - start
+
+
+def _cost(job):
+    # Rough relative render time: GIFs grow with their frames, maps beat path plots
+    kind, _, payload = job
+    if kind == 'animation':
+        return 10 + len(payload)
+    return 2 if kind in ('value_map', 'policy_map') else 1
+
+
+def _array_file(array, name, scratch):
+    # A whole .npy file mapped by np.load (e.g. from the cache) is shared as is,
+    # anything else is written to the scratch directory once
+    filename = getattr(array, 'filename', None)
+    if isinstance(array, np.memmap) and isinstance(array.base, mmap.mmap) and str(filename).endswith('.npy'):
+        return filename
+    path = os.path.join(scratch, f"{name}.npy")
+    np.save(path, np.asarray(array))
+    return path
+
+
+def render_batch(env, jobs, V=None, policy=None, workers=None):
+    """
+    Renders every job, in a process pool of `workers` (default RENDER_WORKERS,
+    0 = all cores). `V` and `policy` are needed by map jobs. Returns
+    (kind, filename, seconds) per job.
+    """
+    for kind, _, _ in jobs:
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown render job: {kind}")
+    workers = workers or config.RENDER_WORKERS or os.cpu_count()
+    workers = max(1, min(workers, len(jobs)))
+    # Longest jobs first so the pool doesn't finish on a long animation
+    order = sorted(range(len(jobs)), key=lambda i: -_cost(jobs[i]))
+
+    print(f"\nRendering {len(jobs)} plots with {workers} worker(s)")
+    start_time = time.time()
+    # Wall time of the whole batch; with workers the per-plot phases are recorded in their processes
+    with recorder.phase('batch_rendering', jobs=len(jobs), workers=workers), tempfile.TemporaryDirectory() as scratch:
+        files = {}
+        for name, array in (('v', V), ('policy', policy)):
+            if array is not None:
+                files[name] = _array_file(array, name, scratch)
+        if workers == 1:
+            _init_worker(env, files)
+            results = [_render(jobs[i]) for i in order]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(env, files)) as pool:
+                results = list(pool.map(_render, [jobs[i] for i in order]))
+    elapsed = time.time() - start_time
+    busy = sum(seconds for _, _, seconds in results)
+    print(f"Rendered {len(jobs)} plots in {elapsed:.2f}s (per-plot render times add up to {busy:.2f}s)")
+    # Back in the order of `jobs`
+    ordered = [None] * len(jobs)
+    for i, result in zip(order, results):
+        ordered[i] = result
+    return ordered
@@ -0,0 +1,136 @@
+import time
+import numpy as np
+from src import config
+from src.cspace import build_collision_map_exact, build_collision_map_raster
+from src.tables import dense
+from src.transitions import predecessor_index, q_values
+
+
+def affected_region(env, polygons):
+    # Grid cells whose footprint can touch any of `polygons`, as (x0, x1, y0, y1)
+    radius = np.hypot(config.ROBOT_LENGTH / 2, config.ROBOT_WIDTH / 2) + 1
+    bounds = np.array([p.bounds for p in polygons])
+    x0 = max(0, int(np.floor(bounds[:, 0].min() - radius)))
+    y0 = max(0, int(np.floor(bounds[:, 1].min() - radius)))
+    x1 = min(env.nx, int(np.ceil(bounds[:, 2].max() + radius)) + 1)
+    y1 = min(env.ny, int(np.ceil(bounds[:, 3].max() + radius)) + 1)
+    return x0, x1, y0, y1
+
+
+def update_obstacles(planner, added=(), removed=()):
+    """
+    Adds/removes obstacles (vertex lists, as in OBSTACLES_VERTICES) and repairs the
+    planner without a full re-solve.
+
+    The collision map is recomputed only inside the bounding box of the changed
+    obstacles grown by the footprint radius, with the planner's collision method,
+    so it equals a full rebuild. Rewards are rebuilt for the states whose
+    successors changed, then value changes are propagated outward from the touched
+    states in waves, in the spirit of LPA*/D* Lite: each wave backs up the current
+    frontier in place and the predecessors of every state whose value moved by more
+    than VI_CONVERGENCE_THRESHOLD form the next one. The policy is re-extracted
+    only for the states the repair visited.
+
+    A change that reaches most of the map (e.g. blocking a passage) is cheaper to
+    re-solve with synchronous sweeps: once the waves have made more than
+    REPLAN_MAX_BACKUPS * (free states) backups or visited more than
+    REPLAN_MAX_STATES of the free states, the planner is re-solved from zero with
+    `run_value_iteration` instead (the old values are no use there: draining the
+    ones made too optimistic by the change takes more sweeps than a cold solve).
+    """
+    start_time = time.time()
+    env = planner.env
+    changed_polygons = [env.add_obstacle(v) for v in added] + [env.remove_obstacle(v) for v in removed]
+    if not changed_polygons:
+        return {'collision_changes': 0, 'repaired_states': 0, 'updates': 0, 'waves': 0, 'fallback': False,
+                'time': 0.0}
+
+    shape = (planner.nx, planner.ny, planner.n_theta)
+    x0, x1, y0, y1 = affected_region(env, changed_polygons)
+    if planner.collision_method == 'raster':
+        block = build_collision_map_raster(env, region=(x0, x1, y0, y1))
+    else:
+        block = build_collision_map_exact(env, region=(x0, x1, y0, y1))
+    collision = np.array(dense(planner.collision_map))
+    flipped = np.argwhere(collision[x0:x1, y0:y1] != block) + [x0, y0, 0]
+    collision[x0:x1, y0:y1] = block
+    planner._set_collision_map(collision)
+    changed = np.ravel_multi_index(flipped.T, shape) if len(flipped) else np.zeros(0, dtype=np.int64)
+
+    if planner.reward_table is None:
+        planner.build_transition_tables()
+    transitions = planner.transitions
+    if getattr(planner, '_reverse_graph', None) is None:
+        # Obstacle-independent: every (state, action) edge, terminal or not
+        all_edges = np.ones(transitions.next_idx.shape, dtype=bool)
+        planner._reverse_graph = predecessor_index(transitions.next_idx, all_edges, transitions.n_states)
+    indptr, pred_state, _ = planner._reverse_graph
+
+    last_seen = np.zeros(transitions.n_states, dtype=np.int64)
+
+    def predecessors(states):
+        # Distinct predecessors of `states`: gathered from the CSR runs in one go and
+        # deduplicated by keeping the entries that were written last into last_seen
+        lengths = indptr[states + 1] - indptr[states]
+        ends = np.cumsum(lengths)
+        preds = pred_state[np.repeat(indptr[states] - ends + lengths, lengths) + np.arange(ends[-1] if len(ends) else 0)]
+        position = np.arange(len(preds))
+        last_seen[preds] = position
+        return preds[last_seen[preds] == position]
+
+    touched = np.union1d(changed, predecessors(changed))
+    reward, terminal = transitions.rewards(planner.collision_map, planner.goal_map, planner.config, states=touched)
+    planner.reward_table[:, touched] = reward
+    planner.terminal_table[:, touched] = terminal
+
+    active, fixed = planner._terminal_state_values()
+    V = np.array(planner.V, dtype=planner.value_dtype).reshape(-1)
+    V[~active] = fixed[~active]
+    gamma, threshold = planner.config.GAMMA, planner.config.VI_CONVERGENCE_THRESHOLD
+
+    frontier = touched[active[touched]]
+    visited = np.zeros(len(active), dtype=bool)
+    visited[changed] = visited[frontier] = True
+    n_active = int(active.sum())
+    max_backups = planner.config.REPLAN_MAX_BACKUPS * n_active
+    max_states = planner.config.REPLAN_MAX_STATES * n_active
+    repaired = int(visited.sum())
+    updates = waves = 0
+    fallback = False
+    while len(frontier):
+        if updates + len(frontier) > max_backups or repaired > max_states:
+            fallback = True
+            break
+        waves += 1
+        q = q_values(V, planner.reward_table[:, frontier], planner.terminal_table[:, frontier],
+                     transitions.next_idx[:, frontier], gamma)
+        best_value = q.max(axis=0)
+        moved = np.abs(best_value - V[frontier]) > threshold
+        V[frontier] = best_value
+        updates += len(frontier)
+        frontier = predecessors(frontier[moved])
+        frontier = frontier[active[frontier]]
+        repaired += int(np.count_nonzero(~visited[frontier]))
+        visited[frontier] = True
+
+    if fallback:
+        print(f"Repair reached {repaired} of {n_active} free states after {updates} backups, re-solving instead")
+        planner.V = np.zeros(shape, dtype=planner.value_dtype)
+        updates += planner.run_value_iteration(save=False, checkpoint_every=0)['updates']
+        repaired = len(active)
+    else:
+        visited = np.flatnonzero(visited)
+        repaired = len(visited)
+        policy = np.array(planner.policy).reshape(-1)
+        q = q_values(V, planner.reward_table[:, visited], planner.terminal_table[:, visited],
+                     transitions.next_idx[:, visited], gamma)
+        policy[visited] = np.where(active[visited], np.argmax(q, axis=0), -1)
+        planner.V = V.reshape(shape)
+        planner.policy = policy.reshape(shape)
+
+    elapsed = time.time() - start_time
+    print(f"Obstacle update: {len(changed)} collision states changed in region "
+          f"x[{x0}, {x1}) y[{y0}, {y1}), {repaired} states repaired "
+          f"({updates} backups in {waves} waves{', then a full re-solve' if fallback else ''}) in {elapsed:.2f}s")
+    return {'collision_changes': len(changed), 'repaired_states': repaired,
+            'updates': updates, 'waves': waves, 'fallback': fallback, 'time': elapsed}
@@ -0,0 +1,208 @@
+"""
+Reward/GAMMA parameter sweeps over a shared geometry.
+
+The geometry part of the planner's transition model (successor indices, drift
+error, collision/out-of-bounds and goal flags) does not depend on the R_*
+parameters or on GAMMA. `run_sweep` computes it once, places it in shared
+memory and solves every configuration in a pool of worker processes that map
+those arrays instead of copying or recomputing them. Each worker reports the
+convergence time and sweeps, the policy-test pass rate and the goal-reaching
+rate from random free start states.
+
+    python -m src.sweep --set R_DRIFT_PENALTY=-90,-50,0 --set R_ROTATE=-0.5,-0.2 [--workers N]
+"""
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import os
+import time
+import types
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from src import config
+from src.simulation import run_policy_tests
+from src.tables import dense
+from src.transitions import q_values, reward_table, rollout_outcomes, sweep_states
+
+SWEEP_PARAMS = ('R_GOAL', 'R_COLLISION', 'R_STEP', 'R_ROTATE', 'R_DRIFT_PENALTY', 'GAMMA', 'VI_CONVERGENCE_THRESHOLD')
+
+
+class SharedArrays:
+    """
+    NumPy arrays backed by named shared memory blocks. The creating process owns
+    the blocks and unlinks them on `close`; `spec` is what other processes pass
+    to `attach` to map the same arrays without copying.
+    """
+
+    def __init__(self, arrays=None, spec=None):
+        self.owner = spec is None
+        self.blocks, self.arrays, self.spec = {}, {}, spec or {}
+        if self.owner:
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+                view[...] = array
+                self.blocks[name], self.arrays[name] = block, view
+                self.spec[name] = (block.name, array.shape, array.dtype.str)
+        else:
+            for name, (block_name, shape, dtype) in self.spec.items():
+                block = shared_memory.SharedMemory(name=block_name)
+                self.blocks[name] = block
+                self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    @classmethod
+    def attach(cls, spec):
+        return cls(spec=spec)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def close(self):
+        self.arrays = {}
+        for block in self.blocks.values():
+            block.close()
+            if self.owner:
+                block.unlink()
+        self.blocks = {}
+
+
+def shared_geometry(planner):
+    # Everything a reward configuration needs from the planner, as flat arrays
+    planner.build_transition_tables()
+    transitions = planner.transitions
+    goal_flat = dense(planner.goal_map).reshape(-1)
+    collision_flat = dense(planner.collision_map).reshape(-1)
+    hit = transitions.out_of_bounds | collision_flat[transitions.next_idx]
+    return {
+        'next_idx': transitions.next_idx,
+        'drift_error': transitions.drift_error,
+        'hit': hit,
+        'reached': ~hit & goal_flat[transitions.next_idx],
+        'collision': collision_flat,
+        'goal': goal_flat,
+    }
+
+
+def parameter_grid(values):
+    # {'R_ROTATE': [-0.5, -0.2], 'GAMMA': [0.99]} -> one dict per combination
+    names = list(values)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(values[n] for n in names))]
+
+
+_tables = None
+
+
+def _init_worker(spec):
+    global _tables
+    _tables = SharedArrays.attach(spec)
+
+
+def solve_config(overrides, start_states=(), tables=None):
+    """
+    Synchronous value iteration (same update as `run_value_iteration`) for the
+    config with `overrides` applied, on the shared geometry `tables` (the
+    worker's attached arrays by default). Returns one summary row.
+    """
+    t = (tables or _tables).arrays
+    params = types.SimpleNamespace(**{name: getattr(config, name) for name in SWEEP_PARAMS})
+    params.__dict__.update(overrides)
+
+    start_time = time.time()
+    reward = reward_table(t['hit'], t['reached'], t['drift_error'], params)
+    terminal = t['hit'] | t['reached']
+    active = ~(t['collision'] | t['goal'])
+    V = np.where(t['collision'], params.R_COLLISION, np.where(t['goal'], params.R_GOAL, 0.0))
+    sweeps = sweep_states(V, np.flatnonzero(active), t['next_idx'], reward, terminal,
+                          params.GAMMA, params.VI_CONVERGENCE_THRESHOLD)
+    policy = np.where(active, np.argmax(q_values(V, reward, terminal, t['next_idx'], params.GAMMA), axis=0), -1)
+    elapsed = time.time() - start_time
+
+    shape = (config.NX, config.NY, config.N_THETA)
+    with contextlib.redirect_stdout(io.StringIO()):
+        passed, total = run_policy_tests(types.SimpleNamespace(policy=policy.reshape(shape)))
+    row = dict(overrides)
+    row.update({'iterations': sweeps, 'time': elapsed, 'tests_passed': passed, 'tests_total': total})
+    if len(start_states):
+        outcomes = rollout_outcomes(policy, np.ravel_multi_index(np.asarray(start_states).T, shape),
+                                    t['next_idx'], terminal, t['reached'], t['goal'], config.NX * config.NY)
+        row['success_rate'] = outcomes.count('goal') / len(outcomes)
+    return row
+
+
+def run_sweep(planner, configs, workers=None, n_starts=1000, output=None):
+    """
+    Solves every dict of parameter overrides in `configs` on the planner's
+    geometry (its collision and goal maps must be set). With `workers` > 1 the
+    configurations run in a process pool attached to one shared copy of the
+    tables. Returns the summary rows and writes them to `output` as CSV.
+    """
+    from src.simulation import random_free_starts
+
+    workers = workers or min(len(configs), os.cpu_count())
+    start_states = random_free_starts(planner, n_starts) if n_starts else ()
+    start_time = time.time()
+    tables = SharedArrays(shared_geometry(planner))
+    print(f"Shared geometry: {tables.nbytes / 2 ** 20:.1f} MB built in {time.time() - start_time:.2f}s")
+    try:
+        if workers == 1:
+            rows = [solve_config(c, start_states, tables) for c in configs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(tables.spec,)) as pool:
+                rows = list(pool.map(solve_config, configs, itertools.repeat(start_states)))
+    finally:
+        tables.close()
+    print(f"{len(configs)} configurations solved in {time.time() - start_time:.2f}s with {workers} workers")
+
+    print_summary(rows)
+    if output:
+        with open(output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Summary written to {output}")
+    return rows
+
+
+def print_summary(rows):
+    if not rows:
+        return
+    names = list(rows[0])
+    widths = [max(len(n), 10) for n in names]
+    print("  ".join(f"{n:>{w}}" for n, w in zip(names, widths)))
+    for row in rows:
+        cells = [f"{row[n]:.3f}" if isinstance(row[n], float) else str(row[n]) for n in names]
+        print("  ".join(f"{c:>{w}}" for c, w in zip(cells, widths)))
+
+
+def main():
+    from src.environment import Environment
+    from src.planning import ValueIterationPlanner
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=V1,V2,...',
+                        help=f"values to sweep for one of {', '.join(SWEEP_PARAMS)}")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per config, up to all cores)")
+    parser.add_argument('--starts', type=int, default=1000, help="random start states for the success rate")
+    parser.add_argument('--output', default='sweep_results.csv', help="CSV summary file")
+    args = parser.parse_args()
+
+    values = {}
+    for item in args.set:
+        name, _, listed = item.partition('=')
+        if name not in SWEEP_PARAMS:
+            parser.error(f"Unknown sweep parameter: {name}")
+        values[name] = [float(v) for v in listed.split(',')]
+
+    planner = ValueIterationPlanner(Environment())
+    planner.precompute_collision_map()
+    run_sweep(planner, parameter_grid(values), args.workers, args.starts, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import numpy as np
+
+
+class PackedBoolMap:
+    """
+    Boolean state map stored one bit per state (np.packbits layout over the flat
+    C-order index). Supports the indexing the planner needs: single-state
+    `map[x, y, theta]` reads/writes and vectorized `lookup` of flat indices.
+    """
+
+    def __init__(self, shape, bits=None):
+        self.shape = tuple(shape)
+        self.size = int(np.prod(self.shape))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8) if bits is None else bits
+
+    @classmethod
+    def from_dense(cls, dense):
+        dense = np.asarray(dense, dtype=bool)
+        return cls(dense.shape, np.packbits(dense.reshape(-1)))
+
+    def lookup(self, flat_idx):
+        flat_idx = np.asarray(flat_idx)
+        return ((self.bits[flat_idx >> 3] >> (7 - (flat_idx & 7))) & 1).astype(bool)
+
+    def __getitem__(self, state):
+        return self.lookup(np.ravel_multi_index(state, self.shape))
+
+    def __setitem__(self, state, value):
+        flat = np.ravel_multi_index(state, self.shape)
+        mask = np.left_shift(1, 7 - (flat & 7)).astype(np.uint8)
+        if value:
+            self.bits[flat >> 3] |= mask
+        else:
+            self.bits[flat >> 3] &= ~mask
+
+    def to_dense(self):
+        return np.unpackbits(self.bits, count=self.size).view(bool).reshape(self.shape)
+
+    def count(self):
+        return int(np.unpackbits(self.bits, count=self.size).sum())
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+
+class SparseGoalSet:
+    """Set of goal states stored as sorted flat indices instead of a dense map."""
+
+    def __init__(self, shape, states=()):
+        self.shape = tuple(shape)
+        self.flat = np.zeros(0, dtype=np.int64)
+        for state in states:
+            self[state] = True
+
+    def lookup(self, flat_idx):
+        return np.isin(flat_idx, self.flat)
+
+    def __getitem__(self, state):
+        return self.lookup(np.ravel_multi_index(state, self.shape))
+
+    def __setitem__(self, state, value):
+        flat = np.ravel_multi_index(state, self.shape)
+        if value:
+            self.flat = np.union1d(self.flat, [flat])
+        else:
+            self.flat = np.setdiff1d(self.flat, [flat])
+
+    def to_dense(self):
+        dense = np.zeros(self.shape, dtype=bool)
+        dense.reshape(-1)[self.flat] = True
+        return dense
+
+    def count(self):
+        return len(self.flat)
+
+    @property
+    def nbytes(self):
+        return self.flat.nbytes
+
+
+# Helpers accepting either a dense bool array or one of the compact maps above
+
+def flat_lookup(table, flat_idx):
+    if isinstance(table, np.ndarray):
+        return table.reshape(-1)[flat_idx]
+    return table.lookup(flat_idx)
+
+
+def dense(table):
+    return table if isinstance(table, np.ndarray) else table.to_dense()
+
+
+def count_true(table):
+    return int(np.count_nonzero(table)) if isinstance(table, np.ndarray) else table.count()
+
+
+def flat_indices(table):
+    # Flat indices of every True state; a sparse set already stores them
+    if isinstance(table, SparseGoalSet):
+        return table.flat
+    return np.flatnonzero(dense(table))
+
+
+def state_indices(table):
+    # (x, y, theta) of every True state
+    if isinstance(table, SparseGoalSet):
+        return np.stack(np.unravel_index(table.flat, table.shape), axis=1)
+    return np.argwhere(dense(table))
+
+
+def format_bytes(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return f"{n:.1f} {unit}" if unit != 'B' else f"{n} B"
+        n /= 1024.0
@@ -0,0 +1,462 @@
+"""
+Out-of-core value iteration on spatial tiles.
+
+V and the collision map live in raw files split into TILE x TILE blocks of
+cells (all headings). Each block is extended by a halo one STEP_SIZE wide
+(rounded up) that holds copies of the neighbouring tiles' border cells, so the
+Bellman backups of a tile only read its own block. A pass visits the tiles that
+are due: the block is mapped and read, swept until its values settle with the
+halo held fixed (at most TILED_INNER_SWEEPS sweeps), written back, and the
+border cells that changed are copied into the neighbours' halos. A tile is due
+again when it didn't settle or when its halo has moved by more than
+VI_CONVERGENCE_THRESHOLD since its last visit, so converged regions are not
+revisited. Tiles are visited in four colours (parity of the tile row and
+column): with several workers, tiles of one colour never write the same bytes.
+
+Only the blocks being swept are mapped, and the per-tile transition tables are
+rebuilt from the collision block on demand (an LRU of TILED_TABLE_CACHE_MB
+keeps the most recent ones), so resident memory depends on the tile size and
+not on the map. Every pass reports the tiles processed, the bytes read and
+written and the resident memory. The solved V and policy are assembled into
+ordinary (NX, NY, N_THETA) .npy files, one row of tiles at a time, next to a
+meta.json like the one of a cached model, so `src.policy_service --model DIR`
+can serve them.
+
+    python -m src.tiled [--dir DIR] [--tile 64] [--workers N] [--inner-sweeps N]
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+import types
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src import config
+from src.cache import model_fields
+from src.cspace import build_collision_map_raster, footprint_kernels
+from src.instrumentation import peak_memory, recorder, resident_memory
+from src.tables import SparseGoalSet, format_bytes
+from src.transitions import heading_vectors, q_values, reward_table
+
+# Offsets of the 8 tiles whose halos overlap a tile's border
+NEIGHBOURS = [(di, dj) for di in (-1, 0, 1) for dj in (-1, 0, 1) if di or dj]
+
+
+class TileLayout:
+    """
+    Tile (i, j) owns the cells i * tile <= x < (i + 1) * tile (same for y); its
+    block adds `halo` cells on every side. Blocks are stored contiguously in
+    tile-major order, edge tiles padded to the full block size.
+    """
+
+    def __init__(self, shape, tile, halo):
+        self.shape = tuple(shape)
+        self.tile, self.halo = tile, halo
+        nx, ny, n_theta = self.shape
+        self.tiles = (-(-nx // tile), -(-ny // tile))
+        self.block = (tile + 2 * halo, tile + 2 * halo, n_theta)
+        self.interior = (slice(halo, halo + tile), slice(halo, halo + tile))
+
+    def ids(self):
+        return [(i, j) for i in range(self.tiles[0]) for j in range(self.tiles[1])]
+
+    def origin(self, tile_id):
+        # Global (x, y) of the block's first cell
+        return tile_id[0] * self.tile - self.halo, tile_id[1] * self.tile - self.halo
+
+    def colour(self, tile_id):
+        return 2 * (tile_id[0] % 2) + tile_id[1] % 2
+
+    def neighbours(self, tile_id):
+        # (neighbour, our block slice, the same cells in the neighbour's block)
+        i, j = tile_id
+        for di, dj in NEIGHBOURS:
+            if 0 <= i + di < self.tiles[0] and 0 <= j + dj < self.tiles[1]:
+                src, dst = [], []
+                for d in (di, dj):
+                    lo = max(self.halo, d * self.tile)
+                    hi = min(self.halo + self.tile, d * self.tile + self.tile + 2 * self.halo)
+                    src.append(slice(lo, hi))
+                    dst.append(slice(lo - d * self.tile, hi - d * self.tile))
+                yield (i + di, j + dj), tuple(src), tuple(dst)
+
+
+class TileStore:
+    """One table in a raw tiled file; each access maps a single block."""
+
+    def __init__(self, path, layout, dtype, block=None, create=False):
+        self.path, self.layout = path, layout
+        self.dtype = np.dtype(dtype)
+        self.block = layout.block if block is None else block
+        self.block_bytes = int(np.prod(self.block)) * self.dtype.itemsize
+        if create:
+            with open(path, 'wb') as f:
+                f.truncate(self.block_bytes * layout.tiles[0] * layout.tiles[1])
+        self.bytes_read = self.bytes_written = 0
+
+    def _map(self, tile_id, mode):
+        index = tile_id[0] * self.layout.tiles[1] + tile_id[1]
+        return np.memmap(self.path, dtype=self.dtype, mode=mode, offset=index * self.block_bytes,
+                         shape=self.block)
+
+    def read(self, tile_id):
+        block = np.array(self._map(tile_id, 'r'))
+        self.bytes_read += block.nbytes
+        return block
+
+    def write(self, tile_id, values, index=()):
+        # Unmapped on return: the pages go back to the page cache, not to our RSS
+        block = self._map(tile_id, 'r+')
+        block[index] = values
+        del block
+        self.bytes_written += np.asarray(values).nbytes
+
+
+def tile_tables(layout, tile_id, collision, goal, cos_t, sin_t, step_size, params):
+    """
+    Bellman tables of the active cells of one tile, in block coordinates:
+    (own, next_idx, reward, terminal), with `own` the flat block index of every
+    active cell. Successors, drift and rewards are computed from the global
+    coordinates with the same expressions as TransitionModel, so the tiles
+    reproduce its tables exactly.
+    """
+    nx, ny, n_theta = layout.shape
+    h, block = layout.halo, layout.block
+    ox, oy = layout.origin(tile_id)
+    lx, ly, theta = np.meshgrid(np.arange(h, h + layout.tile), np.arange(h, h + layout.tile),
+                                np.arange(n_theta), indexing='ij')
+    lx, ly, theta = lx.ravel(), ly.ravel(), theta.ravel()
+    own = np.ravel_multi_index((lx, ly, theta), block)
+    collision, goal = collision.reshape(-1), goal.reshape(-1)
+    active = (lx + ox < nx) & (ly + oy < ny) & ~collision[own] & ~goal[own]
+    lx, ly, theta, own = lx[active], ly[active], theta[active], own[active]
+    x, y = lx + ox, ly + oy
+
+    left = config.ACTIONS['TURN_LEFT']
+    right = config.ACTIONS['TURN_RIGHT']
+    forward = config.ACTIONS['MOVE_FORWARD']
+    value_dtype = params.value_dtype
+    next_idx = np.empty((config.N_ACTIONS, len(own)), dtype=np.int32)
+    drift_error = np.zeros((config.N_ACTIONS, len(own)), dtype=value_dtype)
+    out_of_bounds = np.zeros((config.N_ACTIONS, len(own)), dtype=bool)
+    next_idx[left] = np.ravel_multi_index((lx, ly, (theta - 1) % n_theta), block)
+    next_idx[right] = np.ravel_multi_index((lx, ly, (theta + 1) % n_theta), block)
+
+    next_x = np.round(x + step_size * cos_t[theta]).astype(np.int64)
+    next_y = np.round(y + step_size * sin_t[theta]).astype(np.int64)
+    dx, dy = next_x - x, next_y - y
+    moved = (dx != 0) | (dy != 0)
+    norm = np.sqrt(dx * dx + dy * dy)
+    norm[~moved] = 1.0
+    alignment = (cos_t[theta] * dx + sin_t[theta] * dy) / norm
+    drift_error[forward] = np.where(moved, np.maximum(0.0, 1.0 - alignment), 0.0)
+    out_of_bounds[forward] = (next_x < 0) | (next_x >= nx) | (next_y < 0) | (next_y >= ny)
+    # The halo is as wide as the longest move, so the successor is always in the block
+    next_idx[forward] = np.ravel_multi_index(
+        (np.clip(next_x - ox, 0, block[0] - 1), np.clip(next_y - oy, 0, block[1] - 1), theta), block)
+
+    hit = out_of_bounds | collision[next_idx]
+    reached = ~hit & goal[next_idx]
+    return own, next_idx, reward_table(hit, reached, drift_error, params), hit | reached
+
+
+_env = None
+_spec = None
+_layout = None
+_stores = {}
+_tables = OrderedDict()
+
+
+def _init_worker(env, spec):
+    global _env, _spec, _layout, _stores
+    _env, _spec = env, spec
+    _layout = TileLayout(spec['shape'], spec['tile'], spec['halo'])
+    _stores = _open_stores(spec['directory'], _layout, spec['params'].value_dtype)
+    _tables.clear()
+
+
+def _open_stores(directory, layout, value_dtype, create=False):
+    return {
+        'v': TileStore(os.path.join(directory, 'v.tiles'), layout, value_dtype, create=create),
+        'collision': TileStore(os.path.join(directory, 'collision.tiles'), layout, bool, create=create),
+        'policy': TileStore(os.path.join(directory, 'policy.tiles'), layout, np.int8,
+                            block=(layout.tile, layout.tile, layout.shape[2]), create=create),
+    }
+
+
+def _goal_block(tile_id):
+    goal = np.zeros(_layout.block, dtype=bool)
+    ox, oy = _layout.origin(tile_id)
+    for gx, gy, gtheta in _spec['goals']:
+        if 0 <= gx - ox < goal.shape[0] and 0 <= gy - oy < goal.shape[1]:
+            goal[gx - ox, gy - oy, gtheta] = True
+    return goal
+
+
+def _io():
+    return sum(s.bytes_read for s in _stores.values()), sum(s.bytes_written for s in _stores.values())
+
+
+def _prepare_tile(tile_id):
+    # Collision block (cells outside the grid count as blocked) and the initial V
+    nx, ny, _ = _layout.shape
+    ox, oy = _layout.origin(tile_id)
+    x0, x1 = max(0, ox), min(nx, ox + _layout.block[0])
+    y0, y1 = max(0, oy), min(ny, oy + _layout.block[1])
+    collision = np.ones(_layout.block, dtype=bool)
+    collision[x0 - ox:x1 - ox, y0 - oy:y1 - oy] = build_collision_map_raster(
+        _env, _spec['raster_res'], region=(x0, x1, y0, y1), kernels=_spec['kernels'])
+    goal = _goal_block(tile_id)
+    params = _spec['params']
+    V = np.where(goal, params.R_GOAL, np.where(collision, params.R_COLLISION, 0.0))
+    _stores['collision'].write(tile_id, collision)
+    _stores['v'].write(tile_id, V.astype(params.value_dtype))
+    return int(np.count_nonzero(collision[_layout.interior][:x1 - x0, :y1 - y0]))
+
+
+def _tile_tables(tile_id):
+    # Tables of a tile from the LRU, rebuilt from its collision block on a miss
+    if tile_id in _tables:
+        _tables.move_to_end(tile_id)
+        return _tables[tile_id]
+    tables = tile_tables(_layout, tile_id, _stores['collision'].read(tile_id), _goal_block(tile_id),
+                         *_spec['headings'], _spec['step_size'], _spec['params'])
+    _tables[tile_id] = tables
+    budget = _spec['table_cache_bytes']
+    while len(_tables) > 1 and sum(a.nbytes for t in _tables.values() for a in t) > budget:
+        _tables.popitem(last=False)
+    return tables
+
+
+def _sweep_tile(tile_id):
+    """
+    Sweeps one tile with its halo held fixed. Returns (tile_id, residual of the
+    first sweep, settled, {neighbour: largest change of its halo}, backups,
+    bytes read, bytes written, resident memory).
+    """
+    read_before, written_before = _io()
+    own, next_idx, reward, terminal = _tile_tables(tile_id)
+    V = _stores['v'].read(tile_id)
+    before = V.copy()
+    flat = V.reshape(-1)
+    gamma, threshold = _spec['gamma'], _spec['threshold']
+    residual = delta = 0.0
+    sweeps = 0
+    while len(own) and sweeps < _spec['inner_sweeps']:
+        sweeps += 1
+        best_value = q_values(flat, reward, terminal, next_idx, gamma).max(axis=0)
+        delta = float(np.max(np.abs(best_value - flat[own])))
+        flat[own] = best_value
+        if sweeps == 1:
+            residual = delta
+        if delta < threshold:
+            break
+
+    changes = {}
+    if residual > 0:
+        interior = _layout.interior
+        _stores['v'].write(tile_id, V[interior], interior)
+        # Only the border strips that moved are copied into the neighbours' halos
+        for neighbour, src, dst in _layout.neighbours(tile_id):
+            change = float(np.max(np.abs(V[src] - before[src])))
+            if change > 0:
+                _stores['v'].write(neighbour, V[src], dst)
+                changes[neighbour] = change
+    read_after, written_after = _io()
+    return (tile_id, residual, delta < threshold, changes, sweeps * len(own),
+            read_after - read_before, written_after - written_before, resident_memory())
+
+
+def _extract_tile(tile_id):
+    # Greedy policy of one tile (-1 on collision, goal and padding cells)
+    own, next_idx, reward, terminal = _tile_tables(tile_id)
+    V = _stores['v'].read(tile_id).reshape(-1)
+    tile, h = _layout.tile, _layout.halo
+    lx, ly, theta = np.unravel_index(own, _layout.block)
+    policy = np.full((tile, tile, _layout.shape[2]), -1, dtype=np.int8)
+    policy[lx - h, ly - h, theta] = np.argmax(q_values(V, reward, terminal, next_idx, _spec['gamma']), axis=0)
+    _stores['policy'].write(tile_id, policy)
+    return tile_id
+
+
+def _assemble(store, path, interior=()):
+    # Dense (NX, NY, N_THETA) .npy from the tiles, written one row of tiles at a time
+    layout = store.layout
+    nx, ny, n_theta = layout.shape
+    header = np.lib.format.open_memmap(path, mode='w+', dtype=store.dtype, shape=layout.shape)
+    offset = header.offset
+    del header
+    with open(path, 'r+b') as f:
+        for i in range(layout.tiles[0]):
+            x0, x1 = i * layout.tile, min(nx, (i + 1) * layout.tile)
+            rows = np.empty((x1 - x0, ny, n_theta), dtype=store.dtype)
+            for j in range(layout.tiles[1]):
+                y0, y1 = j * layout.tile, min(ny, (j + 1) * layout.tile)
+                rows[:, y0:y1] = store.read((i, j))[interior][:x1 - x0, :y1 - y0]
+            f.seek(offset + x0 * ny * n_theta * store.dtype.itemsize)
+            rows.tofile(f)
+
+
+def solve_tiled(env, directory=None, tile=None, workers=None, inner_sweeps=None, goals=None, compact=None):
+    """
+    Out-of-core value iteration of the current config in `directory` (default
+    TILED_DIR) with `tile` x `tile` cell tiles (default TILED_TILE_SIZE), swept in
+    `workers` processes (default TILED_WORKERS, 0 = all cores). `goals` defaults
+    to [GOAL_STATE]; with `compact` V is stored as float32. The collision map is
+    the raster one. Writes v.npy, policy.npy and meta.json to `directory` and
+    returns the run statistics.
+    """
+    directory = directory or config.TILED_DIR
+    tile = tile or config.TILED_TILE_SIZE
+    inner_sweeps = inner_sweeps or config.TILED_INNER_SWEEPS
+    compact = config.COMPACT_TABLES if compact is None else compact
+    goals = [tuple(int(v) for v in g) for g in (goals if goals is not None else [config.GOAL_STATE])]
+    shape = (env.nx, env.ny, env.n_theta)
+    halo = max(1, math.ceil(config.STEP_SIZE))
+    layout = TileLayout(shape, tile, halo)
+    ids = layout.ids()
+    if workers is None:
+        workers = config.TILED_WORKERS
+    workers = max(1, min(workers or os.cpu_count(), len(ids)))
+
+    params = types.SimpleNamespace(
+        R_GOAL=config.R_GOAL, R_COLLISION=config.R_COLLISION, R_STEP=config.R_STEP,
+        R_ROTATE=config.R_ROTATE, R_DRIFT_PENALTY=config.R_DRIFT_PENALTY,
+        value_dtype=np.float32 if compact else np.float64)
+    spec = {
+        'directory': directory, 'shape': shape, 'tile': tile, 'halo': halo, 'goals': goals,
+        'params': params, 'gamma': config.GAMMA, 'threshold': config.VI_CONVERGENCE_THRESHOLD,
+        'inner_sweeps': inner_sweeps, 'step_size': config.STEP_SIZE,
+        'headings': heading_vectors(env.n_theta, config.DELTA_THETA_RAD),
+        'raster_res': config.COLLISION_RASTER_RES,
+        'kernels': footprint_kernels(env, config.COLLISION_RASTER_RES),
+        'table_cache_bytes': config.TILED_TABLE_CACHE_MB * 2 ** 20,
+    }
+    os.makedirs(directory, exist_ok=True)
+    stores = _open_stores(directory, layout, params.value_dtype, create=True)
+    n_tiles = len(ids)
+    print(f"\nTiled value iteration: {shape[0]}x{shape[1]}x{shape[2]} in {layout.tiles[0]}x{layout.tiles[1]} "
+          f"tiles of {tile} cells (halo {halo}), {workers} worker(s), "
+          f"{format_bytes(sum(os.path.getsize(s.path) for s in stores.values()))} on disk in {directory}")
+
+    start_time = time.time()
+    pool = None
+    if workers == 1:
+        _init_worker(env, spec)
+        run = map
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(env, spec))
+        run = pool.map
+    try:
+        with recorder.phase('collision_map', method='raster', tiles=n_tiles):
+            collisions = sum(run(_prepare_tile, ids))
+        print(f"Collision tiles built in {time.time() - start_time:.2f}s. Total collisions: {collisions}")
+
+        unsettled, pending = set(ids), dict.fromkeys(ids, 0.0)
+        totals = {'tile_visits': 0, 'updates': 0, 'bytes_read': 0, 'bytes_written': 0, 'resident_memory': 0}
+        iteration = 0
+        with recorder.phase('sweeps', solver='tiled'):
+            while unsettled or max(pending.values()) >= spec['threshold']:
+                iteration += 1
+                sweep_start = time.perf_counter()
+                visits = updates = read = written = 0
+                residual, resident = 0.0, resident_memory() or 0
+                # Colour by colour, so a tile sees the halos its neighbours wrote earlier in the pass
+                for colour in range(4):
+                    due = [t for t in ids if layout.colour(t) == colour
+                           and (t in unsettled or pending[t] >= spec['threshold'])]
+                    for (tile_id, tile_residual, settled, changes, tile_updates,
+                         tile_read, tile_written, tile_resident) in run(_sweep_tile, due):
+                        pending[tile_id] = 0.0
+                        (unsettled.discard if settled else unsettled.add)(tile_id)
+                        for neighbour, change in changes.items():
+                            pending[neighbour] += change
+                        visits += 1
+                        updates += tile_updates
+                        read += tile_read
+                        written += tile_written
+                        residual = max(residual, tile_residual)
+                        resident = max(resident, tile_resident or 0)
+                seconds = time.perf_counter() - sweep_start
+                recorder.sweep('tiled', iteration, residual, updates, seconds)
+                recorder.emit('tiled_pass', iteration=iteration, tiles=visits, bytes_read=read,
+                              bytes_written=written, resident_memory=resident)
+                totals['tile_visits'] += visits
+                totals['updates'] += updates
+                totals['bytes_read'] += read
+                totals['bytes_written'] += written
+                totals['resident_memory'] = max(totals['resident_memory'], resident)
+                print(f"Pass {iteration}: {visits}/{n_tiles} tiles, Max Delta = {residual:.6f}, "
+                      f"read {format_bytes(read)}, written {format_bytes(written)}, "
+                      f"resident {format_bytes(resident)} ({seconds:.2f}s)")
+
+        print("Extracting optimal policy...")
+        with recorder.phase('policy_extraction'):
+            list(run(_extract_tile, ids))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    # Assembled in this process from fresh stores, the workers' counters stay with them
+    stores = _open_stores(directory, layout, params.value_dtype)
+    _assemble(stores['v'], os.path.join(directory, 'v.npy'), layout.interior)
+    _assemble(stores['policy'], os.path.join(directory, 'policy.npy'))
+    fields = model_fields(env, SparseGoalSet(shape, goals), 'raster')
+    fields['compact'] = compact
+    fields['tile'] = tile
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump(fields, f, indent=1, default=float)
+    for store in stores.values():
+        os.remove(store.path)
+
+    elapsed = time.time() - start_time
+    print(f"Tiled Value Iteration finished in {iteration} passes, {totals['tile_visits']} tile visits ({elapsed:.2f}s): "
+          f"read {format_bytes(totals['bytes_read'])}, written {format_bytes(totals['bytes_written'])}, "
+          f"resident at most {format_bytes(totals['resident_memory'])}")
+    totals.update({'method': 'tiled', 'iterations': iteration, 'time': elapsed, 'directory': directory,
+                   'peak_memory': peak_memory()})
+    return totals
+
+
+def map_private_copy(directory, names=('v', 'policy')):
+    """
+    Memory-maps private copies of the `<name>.npy` outputs of `directory`, which
+    the next solve there rewrites. Each copy is unlinked once mapped where the OS
+    allows it, so its disk space goes with the mapping.
+    """
+    scratch = tempfile.mkdtemp(prefix='tiled-')
+    arrays = {}
+    for name in names:
+        path = os.path.join(scratch, f"{name}.npy")
+        shutil.copyfile(os.path.join(directory, f"{name}.npy"), path)
+        arrays[name] = np.load(path, mmap_mode='r')
+        with contextlib.suppress(OSError):
+            os.remove(path)
+    with contextlib.suppress(OSError):
+        os.rmdir(scratch)
+    return arrays
+
+
+def main():
+    from src.environment import Environment
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--dir', default=None, help="working and output directory (default TILED_DIR)")
+    parser.add_argument('--tile', type=int, default=None, help="tile edge in cells (default TILED_TILE_SIZE)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default TILED_WORKERS, 0 = all cores)")
+    parser.add_argument('--inner-sweeps', type=int, default=None,
+                        help="max sweeps per tile visit (default TILED_INNER_SWEEPS)")
+    parser.add_argument('--compact', action='store_true', help="store V as float32")
+    args = parser.parse_args()
+    solve_tiled(Environment(), args.dir, args.tile, args.workers, args.inner_sweeps,
+                compact=args.compact or None)
+    recorder.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import time
+import numpy as np
+from src import config
+from src.instrumentation import recorder
+from src.tables import flat_lookup
+
+
+def heading_vectors(n_theta, delta_theta_rad):
+    # Evaluate cos/sin one heading at a time with the same scalar expression used
+    # by the planner and the environment, so grid snapping rounds identically.
+    cos_t = np.empty(n_theta)
+    sin_t = np.empty(n_theta)
+    for theta_idx in range(n_theta):
+        theta_rad = theta_idx * delta_theta_rad
+        cos_t[theta_idx] = np.cos(theta_rad)
+        sin_t[theta_idx] = np.sin(theta_rad)
+    return cos_t, sin_t
+
+
+class TransitionModel:
+    """
+    Geometry of the deterministic grid MDP, computed once per grid shape.
+
+    For every action and every flat state index it stores the successor index,
+    whether the successor falls outside the grid and the drift error of the move.
+    None of this depends on obstacles or rewards, so it can be reused when either
+    changes; `rewards` combines it with the collision/goal maps. With `compact`
+    the tables use int32 indices and float32 values, halving their footprint.
+    """
+
+    def __init__(self, nx, ny, n_theta, step_size=None, delta_theta_rad=None, compact=False):
+        # Defaults are read at call time so a config changed at runtime is honoured
+        step_size = config.STEP_SIZE if step_size is None else step_size
+        delta_theta_rad = config.DELTA_THETA_RAD if delta_theta_rad is None else delta_theta_rad
+        self.nx, self.ny, self.n_theta = nx, ny, n_theta
+        self.shape = (nx, ny, n_theta)
+        self.n_states = nx * ny * n_theta
+        self.n_actions = config.N_ACTIONS
+        self.index_dtype = np.int32 if compact else np.int64
+        self.value_dtype = np.float32 if compact else np.float64
+
+        self.next_idx = np.empty((self.n_actions, self.n_states), dtype=self.index_dtype)
+        self.out_of_bounds = np.zeros((self.n_actions, self.n_states), dtype=bool)
+        self.drift_error = np.zeros((self.n_actions, self.n_states), dtype=self.value_dtype)
+
+        # Built one slab of x at a time to bound the temporaries on large grids
+        cos_t, sin_t = heading_vectors(n_theta, delta_theta_rad)
+        slab = max(1, (1 << 22) // (ny * n_theta))
+        for x0 in range(0, nx, slab):
+            x1 = min(nx, x0 + slab)
+            self._fill(slice(x0 * ny * n_theta, x1 * ny * n_theta),
+                       np.arange(x0, x1), cos_t, sin_t, step_size)
+
+    def _fill(self, rows, xs, cos_t, sin_t, step_size):
+        nx, ny, n_theta = self.shape
+        x, y, theta = np.meshgrid(xs, np.arange(ny), np.arange(n_theta), indexing='ij')
+        x, y, theta = x.ravel(), y.ravel(), theta.ravel()
+
+        left = config.ACTIONS['TURN_LEFT']
+        right = config.ACTIONS['TURN_RIGHT']
+        forward = config.ACTIONS['MOVE_FORWARD']
+
+        self.next_idx[left, rows] = np.ravel_multi_index((x, y, (theta - 1) % n_theta), self.shape)
+        self.next_idx[right, rows] = np.ravel_multi_index((x, y, (theta + 1) % n_theta), self.shape)
+
+        # Forward move: continuous displacement snapped to the nearest cell
+        next_x = np.round(x + step_size * cos_t[theta]).astype(np.int64)
+        next_y = np.round(y + step_size * sin_t[theta]).astype(np.int64)
+
+        dx, dy = next_x - x, next_y - y
+        moved = (dx != 0) | (dy != 0)
+        norm = np.sqrt(dx * dx + dy * dy)
+        norm[~moved] = 1.0
+        alignment = (cos_t[theta] * dx + sin_t[theta] * dy) / norm
+        self.drift_error[forward, rows] = np.where(moved, np.maximum(0.0, 1.0 - alignment), 0.0)
+
+        oob = (next_x < 0) | (next_x >= nx) | (next_y < 0) | (next_y >= ny)
+        self.out_of_bounds[forward, rows] = oob
+        # Out-of-bounds successors are terminal, point them at a valid index
+        self.next_idx[forward, rows] = np.ravel_multi_index(
+            (np.clip(next_x, 0, nx - 1), np.clip(next_y, 0, ny - 1), theta), self.shape)
+
+    @staticmethod
+    def bytes_per_state(compact=False):
+        # next_idx + drift_error + out_of_bounds, plus the reward/terminal tables
+        index, value = (4, 4) if compact else (8, 8)
+        return config.N_ACTIONS * (index + value + 1 + value + 1)
+
+    def rewards(self, collision_map, goal_map, params=config, states=None):
+        """
+        Returns (reward, terminal) tables of shape (n_actions, n_states), with the
+        same precedence as ValueIterationPlanner._get_next_state_reward:
+        out of bounds, then collision, then goal. With `states` (flat indices) only
+        those columns are computed.
+        """
+        cols = slice(None) if states is None else states
+        next_idx, drift_error = self.next_idx[:, cols], self.drift_error[:, cols]
+        hit = self.out_of_bounds[:, cols] | flat_lookup(collision_map, next_idx)
+        reached = ~hit & flat_lookup(goal_map, next_idx)
+
+        return reward_table(hit, reached, drift_error, params), hit | reached
+
+
+def reward_table(hit, reached, drift_error, params=config):
+    # Rewards from the geometry flags: (hit, reached, drift_error) don't depend on
+    # the R_* parameters, so they can be shared between reward configurations
+    base = np.empty(len(drift_error), dtype=drift_error.dtype)
+    base[config.ACTIONS['TURN_LEFT']] = params.R_ROTATE
+    base[config.ACTIONS['TURN_RIGHT']] = params.R_ROTATE
+    base[config.ACTIONS['MOVE_FORWARD']] = params.R_STEP
+
+    reward = base[:, None] + drift_error.dtype.type(params.R_DRIFT_PENALTY) * drift_error
+    reward[hit] = params.R_COLLISION
+    reward[reached] = params.R_GOAL
+    return reward
+
+
+def q_values(V_flat, reward, terminal, next_idx, gamma):
+    # One synchronous Bellman backup for every (action, state) pair
+    return np.where(terminal, reward, reward + gamma * V_flat[next_idx])
+
+
+def sweep_states(V, states, next_idx, reward, terminal, gamma, threshold, solver=None):
+    """
+    Synchronous value iteration restricted to the flat indices `states`: every
+    other entry of V is held fixed as a boundary condition. `next_idx`, `reward`
+    and `terminal` are the full (n_actions, n_states) tables. Updates V in place
+    and returns the number of sweeps. With a `solver` name every sweep is
+    reported to the recorder.
+    """
+    next_idx, reward, terminal = next_idx[:, states], reward[:, states], terminal[:, states]
+    iteration = 0
+    while len(states):
+        iteration += 1
+        sweep_start = time.perf_counter()
+        best_value = q_values(V, reward, terminal, next_idx, gamma).max(axis=0)
+        delta = np.max(np.abs(best_value - V[states]))
+        V[states] = best_value
+        if solver:
+            recorder.sweep(solver, iteration, delta, len(states), time.perf_counter() - sweep_start)
+        if delta < threshold:
+            break
+    return iteration
+
+
+def predecessor_index(next_idx, edge_mask, n_states):
+    """
+    Reverse transition graph in CSR form. For every state s, the (state, action)
+    pairs whose successor is s are src_state[indptr[s]:indptr[s + 1]] and
+    src_action[indptr[s]:indptr[s + 1]]. Only pairs selected by `edge_mask`
+    (shape (n_actions, n_states)) are included.
+    """
+    src_action, src_state = np.nonzero(edge_mask)
+    targets = next_idx[src_action, src_state]
+    order = np.argsort(targets, kind='stable')
+    indptr = np.zeros(n_states + 1, dtype=np.int64)
+    np.cumsum(np.bincount(targets, minlength=n_states), out=indptr[1:])
+    return indptr, src_state[order], src_action[order]
+
+
+def rollout_outcomes(policy_flat, states, next_idx, terminal, reached, goal_flat, max_steps):
+    """
+    Follows `policy_flat` on the transition tables from the flat start `states`.
+    `reached` marks the terminal transitions that end in the goal. Returns one
+    outcome per start: 'goal', 'collision', 'stall' (policy -1 outside the goal)
+    or 'timeout'.
+    """
+    states = np.array(states)
+    outcome = np.where(goal_flat[states], 'goal', 'timeout').astype(object)
+    live = ~goal_flat[states]
+    for _ in range(max_steps):
+        if not live.any():
+            break
+        idx = np.flatnonzero(live)
+        action = policy_flat[states[idx]]
+        stalled = action < 0
+        outcome[idx[stalled]] = 'stall'
+        live[idx[stalled]] = False
+        idx, action = idx[~stalled], action[~stalled]
+        ended = terminal[action, states[idx]]
+        outcome[idx[ended]] = np.where(reached[action[ended], states[idx[ended]]], 'goal', 'collision')
+        live[idx[ended]] = False
+        states[idx] = next_idx[action, states[idx]]
+    return outcome.tolist()
@@ -1,10 +1,20 @@
-import matplotlib.pyplot as plt
+import matplotlib.colors
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from matplotlib.patches import Polygon as MplPolygon
 import numpy as np
-import matplotlib.animation as animation
+from PIL import Image
+from src import config
+from src.instrumentation import recorder
 
+def _clean_title(title):
+    return title.replace(' ', '_').replace('(', '').replace(')', '').replace(',', '')
+
+@recorder.timed('rendering')
 def plot_static_path(env, path, title="Simulation Path"):
-    fig, ax = plt.subplots(figsize=(10, 10))
+    # Headless figure (no pyplot), so it also renders in worker processes
+    fig = Figure(figsize=(10, 10))
+    ax = fig.add_subplot()
     
     ax.set_xlim(0, env.nx)
     ax.set_ylim(0, env.ny)
@@ -49,18 +59,38 @@ def plot_static_path(env, path, title="Simulation Path"):
     ax.set_title(title)
     
     # Save to file
-    filename = f"{title.replace(' ', '_').replace('(', '').replace(')', '').replace(',', '')}.png"
-    plt.savefig(filename)
+    filename = f"{_clean_title(title)}.png"
+    fig.savefig(filename)
     print(f"Static path image saved: {filename}")
-    
-    plt.close(fig)
+    return filename
 
-def animate_path(env, path, title="Animation"):
-    # Note: Using brute-force MplPolygon update (blit=False) for simplicity and compatibility.
-    # Saves only as GIF to avoid external dependencies like FFMpeg.
+def _frame_indices(n, max_frames):
+    # Evenly spaced subset of 0..n-1 keeping the first and last frame
+    if not max_frames or n <= max_frames:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, max_frames).round().astype(int))
+
+@recorder.timed('rendering')
+def animate_path(env, path, title="Animation", max_frames=None, interval_ms=100):
+    """
+    Saves the path as a GIF. The static scene (grid, obstacles, goal, legend
+    frame) is rendered once and restored for every frame, footprints are
+    computed up front for the whole path, and only the robot, the path line and
+    the title are redrawn. Frames are mapped to one shared palette and streamed
+    to the encoder as they are drawn. With `max_frames` (default
+    ANIMATION_MAX_FRAMES, 0 = all) long paths are subsampled to that many frames.
+    """
     print(f"Starting GIF animation for: {title}")
-    
-    fig, ax = plt.subplots(figsize=(10, 10))
+    max_frames = config.ANIMATION_MAX_FRAMES if max_frames is None else max_frames
+    states = np.asarray(path, dtype=float)
+    corners = env.footprint_corners(states)
+    xs, ys = states[:, 0], states[:, 1]
+    frames = _frame_indices(len(path), max_frames)
+
+    # Headless Agg canvas, independent of the pyplot backend
+    fig = Figure(figsize=(10, 10))
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
     ax.set_xlim(0, env.nx)
     ax.set_ylim(0, env.ny)
     ax.set_aspect('equal')
@@ -71,55 +101,100 @@ def animate_path(env, path, title="Animation"):
         ax.add_patch(MplPolygon(
             obstacle.exterior.coords, closed=True, color='gray', alpha=0.8
         ))
-        
     goal_footprint = env._get_robot_footprint(env.goal_state)
     ax.add_patch(MplPolygon(
         goal_footprint.exterior.coords, closed=True, color='green', alpha=0.7, label='Goal'
     ))
 
-    # Dynamic elements setup
-    start_state = path[0]
-    initial_footprint = env._get_robot_footprint(start_state)
-    
-    robot_patch = MplPolygon(
-        initial_footprint.exterior.coords, closed=True, color='blue', alpha=0.8, label='Robot'
-    )
+    # Dynamic elements are excluded from the cached background
+    robot_patch = MplPolygon(corners[0], closed=True, color='blue', alpha=0.8, label='Robot', animated=True)
     ax.add_patch(robot_patch)
+    path_line, = ax.plot([], [], 'r--', label='Path (Center)', animated=True)
+    legend = ax.legend(loc='upper left')
+    legend.set_animated(True)
+    ax.set_title(title, animated=True)
+    canvas.draw()
+    background = canvas.copy_from_bbox(fig.bbox)
 
-    path_line, = ax.plot([], [], 'r--', label='Path (Center)')
-    
-    ax.legend(loc='upper left')
-    ax.set_title(title)
+    def render(frame_index):
+        canvas.restore_region(background)
+        robot_patch.set_xy(corners[frame_index])
+        # Views of the precomputed centers, no per-frame list rebuilding
+        path_line.set_data(xs[:frame_index + 1], ys[:frame_index + 1])
+        ax.title.set_text(f"{title} (Step: {frame_index+1}/{len(path)})")
+        for artist in (robot_patch, path_line, legend, ax.title):
+            fig.draw_artist(artist)
+        return Image.frombuffer('RGBA', canvas.get_width_height(), canvas.buffer_rgba()).convert('RGB')
 
-    def update_frame(frame_index):
-        current_state = path[frame_index]
-        ax.set_title(f"{title} (Step: {frame_index+1}/{len(path)})")
-        
-        # Update robot polygon vertices
-        current_footprint = env._get_robot_footprint(current_state)
-        robot_patch.set_xy(current_footprint.exterior.coords)
-        
-        # Update path line data
-        x_data = [s[0] for s in path[:frame_index+1]]
-        y_data = [s[1] for s in path[:frame_index+1]]
-        path_line.set_data(x_data, y_data)
-        
-        return robot_patch, path_line
+    # One palette for the whole GIF, from the first and the (fullest) last frame
+    first, last = render(frames[0]), render(frames[-1])
+    sample = Image.new('RGB', (first.width, 2 * first.height))
+    sample.paste(first, (0, 0))
+    sample.paste(last, (0, first.height))
+    palette = sample.quantize(colors=256, method=Image.Quantize.MEDIANCUT)
 
-    interval_ms = 100 
-    ani = animation.FuncAnimation(
-        fig, update_frame, frames=len(path),
-        interval=interval_ms, blit=False, repeat=False
-    )
-    
-    clean_title = title.replace(' ', '_').replace('(', '').replace(')', '').replace(',', '')
-    filename_gif = f"{clean_title}.gif"
-    
-    print(f"Saving GIF (this might take a while): {filename_gif}")
+    def encoded(indices):
+        for frame_index in indices:
+            yield render(frame_index).quantize(palette=palette, dither=Image.Dither.NONE)
+
+    filename_gif = f"{_clean_title(title)}.gif"
+
+    print(f"Saving GIF ({len(frames)} of {len(path)} frames): {filename_gif}")
     try:
-        ani.save(filename_gif, writer='pillow', fps=1000/interval_ms)
+        head = first.quantize(palette=palette, dither=Image.Dither.NONE)
+        head.save(filename_gif, save_all=True, append_images=encoded(frames[1:]),
+                  duration=interval_ms, loop=0, optimize=False)
         print(f"GIF saved successfully: {filename_gif}")
     except Exception as e:
         print(f"!!! ERROR saving GIF: {e}")
+    return filename_gif
 
-    plt.close(fig)
\ No newline at end of file
+def _state_map(env, title):
+    # Figure with the obstacle outlines over a (NX, NY) map, x to the right
+    fig = Figure(figsize=(10, 10))
+    ax = fig.add_subplot()
+    ax.set_xlim(0, env.nx)
+    ax.set_ylim(0, env.ny)
+    ax.set_aspect('equal')
+    ax.set_title(title)
+    for obstacle in env.obstacles:
+        ax.add_patch(MplPolygon(obstacle.exterior.coords, closed=True, fill=False, edgecolor='black', linewidth=1))
+    gx, gy, _ = env.goal_state
+    ax.plot(gx, gy, marker='*', color='white', markeredgecolor='black', markersize=15, label='Goal')
+    return fig, ax
+
+@recorder.timed('rendering')
+def plot_value_map(env, V, theta_idx, title=None):
+    """Heatmap of V over (x, y) for one heading; V may be a memory-mapped array."""
+    heading = theta_idx * config.DELTA_THETA_DEG
+    title = title or f"Value_{theta_idx}_{heading:g}deg"
+    fig, ax = _state_map(env, f"V at heading {heading:g} deg")
+    image = ax.imshow(np.asarray(V[:, :, theta_idx]).T, origin='lower', extent=(-0.5, env.nx - 0.5, -0.5, env.ny - 0.5),
+                      cmap='viridis', interpolation='nearest', zorder=0)
+    fig.colorbar(image, ax=ax, fraction=0.046, pad=0.04, label='V')
+    ax.legend(loc='upper left')
+    filename = f"{_clean_title(title)}.png"
+    fig.savefig(filename)
+    print(f"Value map saved: {filename}")
+    return filename
+
+POLICY_COLORS = {-1: '#404040', 0: '#1f77b4', 1: '#ff7f0e', 2: '#2ca02c'}
+
+@recorder.timed('rendering')
+def plot_policy_map(env, policy, theta_idx, title=None):
+    """Map of the policy's action over (x, y) for one heading (-1 = no action)."""
+    heading = theta_idx * config.DELTA_THETA_DEG
+    title = title or f"Policy_{theta_idx}_{heading:g}deg"
+    fig, ax = _state_map(env, f"Policy at heading {heading:g} deg")
+    actions = np.asarray(policy[:, :, theta_idx]).T
+    colors = np.array([matplotlib.colors.to_rgb(POLICY_COLORS[a]) for a in (-1, 0, 1, 2)])
+    ax.imshow(colors[actions + 1], origin='lower', extent=(-0.5, env.nx - 0.5, -0.5, env.ny - 0.5),
+              interpolation='nearest', zorder=0)
+    names = {-1: 'None', **{a: name for name, a in config.ACTIONS.items()}}
+    for action, color in POLICY_COLORS.items():
+        ax.add_patch(MplPolygon([(0, 0)], color=color, label=names[action]))
+    ax.legend(loc='upper left')
+    filename = f"{_clean_title(title)}.png"
+    fig.savefig(filename)
+    print(f"Policy map saved: {filename}")
+    return filename